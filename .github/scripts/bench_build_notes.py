@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Time & memory benchmark of the build notes pipeline on a synthetic release
+
+Parses the pr bodies, groups them and builds the dumpable build notes, once with
+the compact TableRow records and once with the parser used before TableRow, which
+builds a dict per row. Both are grouped by the same generate_build_notes.
+
+Usage: python .github/scripts/bench_build_notes.py [rows] [rows_per_pr]
+"""
+import sys
+import time
+import tracemalloc
+
+from bench_markdown_parser import legacy_markdown_tables_to_dicts, make_pr_body
+from create_build_notes import (
+    cleanup_generated_yaml_data,
+    generate_build_notes,
+    parse_pr_bodies,
+)
+
+
+def get_pr_body(pr_info_list):
+    items = ((item["number"], item["body"]) for item in pr_info_list)
+    return {number: data for number, data in parse_pr_bodies(items) if data}
+
+
+def legacy_get_pr_body(pr_info_list):
+    final_dict = {}
+    for item in pr_info_list:
+        data = legacy_markdown_tables_to_dicts(item["body"])
+        if data:
+            final_dict[item["number"]] = data
+    return final_dict
+
+
+def run(pr_info_list, as_dicts):
+    tracemalloc.start()
+    start = time.perf_counter()
+    if as_dicts:
+        final_dict = legacy_get_pr_body(pr_info_list)
+    else:
+        final_dict = get_pr_body(pr_info_list)
+    parsed_size = tracemalloc.get_traced_memory()[0]
+    yaml_data = generate_build_notes(final_dict, summaries={})
+    cleanup_generated_yaml_data(yaml_data, "01-01-2024", "v0.0.0", "bench")
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, parsed_size, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rows_per_pr = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    pr_info_list = [
+        {"number": number, "body": make_pr_body(rows_per_pr)}
+        for number in range(rows // rows_per_pr)
+    ]
+    for name, as_dicts in [("dicts", True), ("records", False)]:
+        elapsed, parsed_size, peak = run(pr_info_list, as_dicts)
+        print(
+            f"{name:>8}: {elapsed * 1000:8.1f} ms, parsed tables {parsed_size / 1024**2:6.2f} MB, peak {peak / 1024**2:6.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
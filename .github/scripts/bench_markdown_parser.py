@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro benchmark of the markdown table parser against the previous implementation
+
+Usage: python .github/scripts/bench_markdown_parser.py [rows] [repeats]
+"""
+import re
+import sys
+import timeit
+
+from markdown_parser import iter_table_rows, markdown_tables_to_dicts
+
+CHANGES_ROW = "| CRP-{i} | bug | comp{i} | fixed issue {i} in the player | 1. run<br>2. check | none |"
+CONFIG_ROW = "| comp{i} | config{i}.yaml | a.b.key{i} | key {i} | no | str | any | x{i} | y{i} |"
+
+
+def legacy_markdown_tables_to_dicts(markdown_text):
+    """
+    markdown_tables_to_dicts of create_build_notes.py before the shared parser
+    """
+    tables = {}
+    current_table = None
+    if not markdown_text or not markdown_text.startswith("### Changes"):
+        return tables
+    lines = markdown_text.strip().split("\n")
+    skip_section = False
+    for line in lines:
+        if re.match(r"^#+\s+\w+", line):  # Check for headings
+            current_table = None
+            table_name = line.strip("#").strip()
+            if table_name == "PR changes":
+                skip_section = True
+                continue
+            else:
+                skip_section = False
+            if table_name not in tables:
+                tables[table_name] = {}
+                tables[table_name]["skip_rows_count"] = 1
+            else:
+                tables[table_name]["skip_rows_count"] = 2
+            current_table = tables[table_name]
+        elif re.match(r"^\s*\|.*\|\s*$", line):  # Check for table rows
+            if not skip_section:
+                if current_table is not None:
+                    if "headers" not in current_table:
+                        current_table["headers"] = [
+                            header.strip()
+                            for header in line.strip("|").split("|")
+                            if header.strip()
+                        ]
+                        current_table["data"] = []
+                    else:
+                        if current_table["skip_rows_count"] == 0:
+                            row_data = [
+                                data.strip() for data in line.strip("|").split("|")
+                            ]
+                            if current_table["data"] or any(
+                                cell.strip() for cell in row_data
+                            ):
+                                current_table["data"].append(
+                                    dict(zip(current_table["headers"], row_data))
+                                )
+                        else:
+                            current_table["skip_rows_count"] -= 1
+    return tables
+
+
+def make_pr_body(rows):
+    """
+    returns a pr body following the pull request template with rows entries per table
+    """
+    lines = [
+        "### Changes",
+        "",
+        "| Jira ID | Type | Component name | Change Description | Steps to reproduce & validate | Impact on other features/components |",
+        "| ------- | ---- | -------------- | ------------------ | ----------------------------- | ----------------------------------- |",
+    ]
+    lines.extend(CHANGES_ROW.format(i=i) for i in range(rows))
+    lines.extend(["", "### Config Changes", "", "#### New Configs", ""])
+    lines.append(
+        "| component | file | keyPath | description | mandatory | type | allowed-value | default-value | sample-value |"
+    )
+    lines.append("| --- | --- | --- | --- | --- | --- | --- | --- | --- |")
+    lines.extend(CONFIG_ROW.format(i=i) for i in range(rows))
+    # free text between the tables, e.g. pasted logs
+    lines.extend(["", "### PR changes", ""])
+    lines.extend(f"log line {i}: something happened" for i in range(rows))
+    return "\r\n".join(lines)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    body = make_pr_body(rows)
+    assert legacy_markdown_tables_to_dicts(body) == markdown_tables_to_dicts(
+        body, skip_sections=("PR changes",), required_prefix="### Changes"
+    )
+    size_mb = len(body) / 1024**2
+    line_count = body.count("\n") + 1
+    for name, func in [
+        ("legacy", lambda: legacy_markdown_tables_to_dicts(body)),
+        (
+            "shared",
+            lambda: markdown_tables_to_dicts(
+                body, skip_sections=("PR changes",), required_prefix="### Changes"
+            ),
+        ),
+        (
+            "stream",
+            lambda: sum(
+                1
+                for _ in iter_table_rows(
+                    body, skip_sections=("PR changes",), required_prefix="### Changes"
+                )
+            ),
+        ),
+    ]:
+        best = min(timeit.repeat(func, number=1, repeat=repeats))
+        print(
+            f"{name:>8}: {best * 1000:8.1f} ms, {size_mb / best:6.1f} MB/s, {line_count / best:10.0f} lines/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+State of the last build notes generation of a tag
+
+Saved next to build_notes.yaml, so it is committed to the rc-build-notes-<tag>
+branch with it. It holds the prs processed so far in order, their lastEditedAt, the
+jira summaries and the grouped build notes data. When the processed prs are the
+unchanged start of the pr list of a rerun for the same tag, only the prs after them
+are fetched and folded into the saved build notes data. Otherwise all the prs are
+fetched again.
+
+Incremental generation is enabled by setting BUILD_NOTES_STATE to the path of the
+state file, it costs an extra graphql query per 100 prs to read their lastEditedAt.
+Only the pr body feeds the build notes, so lastEditedAt is compared instead of
+updatedAt, which also changes with every comment, label or review.
+"""
+
+import json
+import os
+
+# path of the state file, e.g. build_notes_state.json. Empty disables incremental generation
+BUILD_NOTES_STATE = os.environ.get("BUILD_NOTES_STATE", "")
+STATE_VERSION = 3
+
+
+class BuildNotesState:
+    """
+    Processed prs of a repo & tag
+    """
+
+    def __init__(self, repo: str, tag: str) -> None:
+        """
+        init function
+        """
+        self.repo = repo
+        self.tag = tag
+        # pr numbers in the order they were folded into aggregate
+        self.order = []
+        # pr number -> lastEditedAt when it was processed, "" if it was never edited
+        # and None if it couldn't be read
+        self.edited_at = {}
+        self.summaries = {}
+        self.aggregate = None
+
+    @classmethod
+    def load(cls, path: str, repo: str, tag: str) -> "BuildNotesState":
+        """
+        returns the state saved at path, an empty state if there is none for repo & tag
+        """
+        state = cls(repo, tag)
+        try:
+            with open(path, mode="r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return state
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != STATE_VERSION
+            or data.get("repo") != repo
+            or data.get("tag") != tag
+        ):
+            print(f"Ignoring build notes state of another release -> {path}")
+            return state
+        state.order = data["order"]
+        state.edited_at = data["edited_at"]
+        state.summaries = data["summaries"]
+        state.aggregate = data["aggregate"]
+        return state
+
+    def can_extend(self, pr_list, edited_at: dict) -> bool:
+        """
+        returns if the saved build notes data can be extended with the prs of pr_list
+        after the processed ones
+
+        That is the processed prs are the start of pr_list and none of their bodies was
+        edited since, edited_at is the map of pr number to its current lastEditedAt.
+        """
+        if self.aggregate is None or pr_list[: len(self.order)] != self.order:
+            return False
+        for pr_number in self.order:
+            processed_at = self.edited_at.get(pr_number)
+            if processed_at is None or edited_at.get(pr_number) != processed_at:
+                return False
+        return True
+
+    def save(self, path: str) -> None:
+        """
+        write the state to path
+        """
+        data = {
+            "version": STATE_VERSION,
+            "repo": self.repo,
+            "tag": self.tag,
+            "order": self.order,
+            "edited_at": self.edited_at,
+            "summaries": self.summaries,
+            "aggregate": self.aggregate,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as fh:
+            # grouped config rows are TableRow mappings
+            json.dump(data, fh, default=dict)
+        os.replace(tmp_path, path)
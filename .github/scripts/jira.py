@@ -1,7 +1,8 @@
 import json
+import re
 import sys
 
-import requests
+import http_client
 
 # TODO: update payload data with user provided data
 
@@ -12,25 +13,62 @@ custom_field_key_2_jira_key_map = {
 }
 
 
+# issues fetched per search call, jira caps maxResults at 100
+SEARCH_PAGE_SIZE = 100
+ISSUE_KEY_PATTERN = re.compile(r"^[A-Z][A-Z0-9_]*-\d+$")
+
+
+def has_value(values, value):
+    """
+    returns if value is one of the ", " separated values of the custom field row
+    """
+    existing = ", ".join(values)
+    return (
+        existing == value
+        or existing.startswith(f"{value}, ")
+        or existing.endswith(f", {value}")
+        or f", {value}, " in existing
+    )
+
+
 class Jira:
 
-    def __init__(self, token):
+    def __init__(self, token, cache=None):
         self.token = token
+        # optional jira_cache.JiraCache used by get_summaries
+        self.cache = cache
         self.url = "https://amagiengg.atlassian.net/rest/api/latest/issue"
+        self.search_url = "https://amagiengg.atlassian.net/rest/api/latest/search"
         self.default_payload = {
             "fields": {
                 "customfield_12562": "||Changed Component Name, In case code change is needed| |\n||What are the steps to reproduce this issue?| |\n||Are there any features likely to be impacted? If so, what are the features and what is impact?| |\n||How can this change be tested? Is there any additional tests to be done other than bug fix validation?| |\n||Should this fix be considered for LTS Release?| Yes / No | |\n||Is the fix for this issue available in any of the latest CP releases?| |",
             }
         }
 
-    def get(self, issue_key):
+    def get(self, issue_key, fields=None, expand=None):
+        """
+        Fetch a single issue
+
+        Params:
+        issue_key: str
+        fields: list of fields to be returned, all the fields if None
+        expand: list of entities to be expanded (changelog, renderedFields, ...), nothing is expanded if None
+
+        Returns:
+        dict of issue data, empty if the issue doesn't exist
+        """
         url = f"{self.url}/{issue_key}"
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Basic {self.token}",
         }
+        params = {}
+        if fields is not None:
+            params["fields"] = ",".join(fields)
+        if expand:
+            params["expand"] = ",".join(expand)
         # Send GET request
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers, params=params)
         if (
             response.status_code != 200
         ):  # issue doesn't exist or api key doesn't have permissions
@@ -39,6 +77,105 @@ class Jira:
         response_data = response.json()
         return response_data
 
+    def get_many(self, issue_keys, fields=None, expand=None):
+        """
+        Fetch multiple issues with jql searches of SEARCH_PAGE_SIZE keys each
+
+        Params:
+        issue_keys: iterable of issue keys, duplicates are fetched once
+        fields: list of fields to be returned for each issue, all the fields if None
+        expand: list of entities to be expanded for each issue, nothing is expanded if None
+
+        Returns:
+        dict, list
+        first return param maps issue key to the issue data, same as the return value of get
+        second return param is the list of keys that don't exist or the api key doesn't have permissions for
+        """
+        issues, missing = {}, []
+        # jira keys are case insensitive, the searches use the upper cased key and the
+        # results are returned under the key as it was requested
+        requested = {}
+        for key in dict.fromkeys(k.strip() for k in issue_keys):
+            if ISSUE_KEY_PATTERN.match(key.upper()):
+                requested.setdefault(key.upper(), []).append(key)
+            else:
+                missing.append(key)
+        keys = list(requested)
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {self.token}",
+        }
+        for i in range(0, len(keys), SEARCH_PAGE_SIZE):
+            page = keys[i : i + SEARCH_PAGE_SIZE]
+            payload = {
+                "jql": f"key in ({', '.join(page)})",
+                "startAt": 0,
+                "maxResults": len(page),
+                # report non existing keys as warnings instead of failing the whole query
+                "validateQuery": "warn",
+            }
+            if fields is not None:
+                payload["fields"] = fields
+            if expand:
+                payload["expand"] = expand
+            response = http_client.post(
+                self.search_url, headers=headers, data=json.dumps(payload)
+            )
+            if response.status_code != 200:
+                print(
+                    f"Failed searching issues {page}. Status code: {response.status_code}, Error: {response.text}"
+                )
+                for key in page:
+                    missing.extend(requested[key])
+                continue
+            found = {issue["key"]: issue for issue in response.json().get("issues", [])}
+            for key in page:
+                issue = found.get(key)
+                if issue is None:
+                    # a moved issue is returned under its new key, the single issue
+                    # api follows the move
+                    issue = self.get(key, fields=fields, expand=expand)
+                for requested_key in requested[key]:
+                    if issue:
+                        issues[requested_key] = issue
+                    else:
+                        missing.append(requested_key)
+        return issues, missing
+
+    def get_summaries(self, issue_keys):
+        """
+        Resolve summaries of multiple issues, reading from the cache first if one is set
+
+        Only the keys that aren't cached (or expired) are fetched from jira, and those
+        are added to the cache.
+
+        Returns:
+        dict, list
+        first return param maps issue key to its summary
+        second return param is the list of keys that don't exist or the api key doesn't have permissions for
+        """
+        summaries, to_fetch = {}, []
+        for key in dict.fromkeys(k.strip() for k in issue_keys):
+            entry = self.cache.get(key) if self.cache is not None else None
+            if entry is not None:
+                summaries[key] = entry["summary"]
+            else:
+                to_fetch.append(key)
+        if not to_fetch:
+            return summaries, []
+        issues, missing = self.get_many(to_fetch, fields=["summary", "updated"])
+        for key, issue in issues.items():
+            fields = issue.get("fields", {})
+            summaries[key] = fields.get("summary", "")
+            if self.cache is not None:
+                self.cache.set(key, summaries[key], fields.get("updated", ""))
+        if self.cache is not None:
+            try:
+                self.cache.save()
+            except OSError as err:
+                print(f"Failed saving jira cache with error {err}")
+        return summaries, missing
+
     def put(self, issue_key, payload):
         url = f"{self.url}/{issue_key}"
         # Prepare headers
@@ -53,14 +190,15 @@ class Jira:
             }
         }
         # Send the PUT request
-        response = requests.put(url, headers=headers, data=json.dumps(payload))
+        response = http_client.put(url, headers=headers, data=json.dumps(payload))
         # Check response status
         if response.status_code == 204:
             print(f"Custom field updated successfully for {issue_key}")
-        else:
-            print(
-                f"Failed to update custom field for {issue_key}. Status code: {response.status_code}, Error: {response.text}"
-            )
+            return True
+        print(
+            f"Failed to update custom field for {issue_key}. Status code: {response.status_code}, Error: {response.text}"
+        )
+        return False
 
     def payload_str_to_dict(
         self, payload_data, pr_data
@@ -71,7 +209,9 @@ class Jira:
         for k, v in custom_field_key_2_jira_key_map.items():
             # print(k, v)
             if k in payload_data_dict:
-                payload_data_dict[k].append(pr_data[v])
+                # skip values added by an earlier run, so reruns don't repeat them
+                if not has_value(payload_data_dict[k], pr_data[v]):
+                    payload_data_dict[k].append(pr_data[v])
         return payload_data_dict
 
     def jira_custom_field_to_dict(self, custom_field_data):
@@ -100,7 +240,7 @@ def main():
     issue_key = sys.argv[2]  # Jira ID
     jira = Jira(token)
     # issue_exists, current_custom_field_data = jira.get(issue_key)
-    response_data = jira.get(issue_key)
+    response_data = jira.get(issue_key, fields=["customfield_12562"])
     # print(response_data)
     if not response_data:
         print(
@@ -0,0 +1,107 @@
+"""
+Persistent cache of jira issue metadata
+
+Shared by the pr validator and the build notes generator so an issue key that was
+already resolved doesn't need another jira round trip. Entries hold the issue
+summary and its updated timestamp, expire after JIRA_CACHE_TTL seconds and the
+least recently used ones are evicted beyond JIRA_CACHE_MAX_ENTRIES.
+
+The cache file lives in BUILD_NOTES_CACHE_DIR and is persisted with actions/cache
+under its own key. The build notes workflow saves it from the branch run, the pr
+validator & ledger runs of prs into that branch restore it.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from response_cache import BUILD_NOTES_CACHE_DIR
+
+JIRA_CACHE_TTL = int(os.environ.get("JIRA_CACHE_TTL", str(24 * 60 * 60)))
+JIRA_CACHE_MAX_ENTRIES = int(os.environ.get("JIRA_CACHE_MAX_ENTRIES", "20000"))
+
+
+class JiraCache:
+    """
+    Issue key -> {"exists", "summary", "updated", "cached_at"} map, stored as a json file
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: int = JIRA_CACHE_TTL,
+        max_entries: int = JIRA_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """
+        init function
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        try:
+            with open(self.path, mode="r", encoding="utf-8") as fh:
+                self.entries.update(json.load(fh))
+        except (OSError, ValueError):
+            pass
+
+    def get(self, issue_key: str) -> dict:
+        """
+        returns the cached entry of issue_key, None if it isn't cached or expired
+        """
+        with self.lock:
+            entry = self.entries.get(issue_key)
+            if entry is None:
+                return None
+            if time.time() - entry["cached_at"] > self.ttl:
+                del self.entries[issue_key]
+                return None
+            self.entries.move_to_end(issue_key)
+            return entry
+
+    def set(self, issue_key: str, summary: str, updated: str = "") -> None:
+        """
+        cache an existing issue
+        """
+        with self.lock:
+            self.entries[issue_key] = {
+                "exists": True,
+                "summary": summary,
+                "updated": updated,
+                "cached_at": time.time(),
+            }
+            self.entries.move_to_end(issue_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self) -> None:
+        """
+        write the cache to disk
+        """
+        with self.lock:
+            data = json.dumps(self.entries)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as fh:
+            fh.write(data)
+        os.replace(tmp_path, self.path)
+
+
+_jira_cache = None
+_jira_cache_lock = threading.Lock()
+
+
+def get_jira_cache():
+    """
+    returns the shared jira cache, None if caching is disabled
+    """
+    global _jira_cache
+    if not BUILD_NOTES_CACHE_DIR:
+        return None
+    with _jira_cache_lock:
+        if _jira_cache is None:
+            _jira_cache = JiraCache(os.path.join(BUILD_NOTES_CACHE_DIR, "jira.json"))
+    return _jira_cache
@@ -0,0 +1,507 @@
+"""
+Markdown table parser shared by the pr validator and the build notes generator
+
+Converts the tables of a pr body to a map of heading -> {"headers", "data", "skip_rows_count"}.
+Each line is classified by its first character, so the patterns are only matched
+against lines that can be headings or table rows.
+
+iter_table_rows parses a str, a text stream or any iterable of lines and yields the
+rows as they are parsed, without holding the whole text or the parsed tables in memory.
+
+Rows are TableRow records, read-only mappings of header -> cell that share the
+header index of their table instead of repeating the header strings in every row.
+
+A pr body can carry the same data as json in a fenced code block with the language
+build-notes. If the block is present it's decoded in one step and the tables
+aren't parsed. A str can have the block anywhere. A text stream or iterable of lines
+is parsed as it is read, so there the block is only used if it comes before the
+first table, a block after it is ignored:
+
+```build-notes
+{"Changes": [{"Jira ID": "CRP-1", "Type": "bug", ...}], "New Configs": [...], "Dependencies": ["..."]}
+```
+"""
+
+import itertools
+import json
+import re
+from collections.abc import Mapping
+
+HEADING_PATTERN = re.compile(r"^#+\s+\w+")
+ROW_PATTERN = re.compile(r"^\s*\|.*\|\s*$")
+FAST_PATH_MARKER = "```build-notes"
+FAST_PATH_PATTERN = re.compile(r"^```build-notes[ \t]*\r?\n(.*?)^```", re.M | re.S)
+_CONFIG_HEADERS = (
+    "component",
+    "file",
+    "keyPath",
+    "description",
+    "mandatory",
+    "type",
+    "allowed-value",
+    "default-value",
+    "sample-value",
+)
+# columns of the pull_request_template.md tables, keys left out in the build-notes
+# block are filled with "" like empty cells
+TEMPLATE_HEADERS = {
+    "Changes": (
+        "Jira ID",
+        "Type",
+        "Component name",
+        "Change Description",
+        "Steps to reproduce & validate",
+        "Impact on other features/components",
+    ),
+    "New Configs": _CONFIG_HEADERS,
+    "Changed Configs": _CONFIG_HEADERS,
+    "Removed Configs": _CONFIG_HEADERS[:4],
+    "Deprecated Configs": _CONFIG_HEADERS[:4],
+    "Dependencies": ("Dependencies",),
+    "Limitations": ("Limitations",),
+    "Deprecated Features": ("Deprecated Features",),
+}
+
+
+class TableRow(Mapping):
+    """
+    Compact table row, behaves like the dict(zip(headers, cells)) of the row
+    """
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, index: dict, values: tuple) -> None:
+        """
+        index is the header -> position map shared by all the rows of the table
+        """
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        position = self._index[key]
+        if position >= len(self._values):
+            raise KeyError(key)
+        return self._values[position]
+
+    def __iter__(self):
+        count = len(self._values)
+        return (key for key, position in self._index.items() if position < count)
+
+    def __len__(self) -> int:
+        count = len(self._values)
+        return sum(1 for position in self._index.values() if position < count)
+
+    def __repr__(self) -> str:
+        return f"TableRow({dict(self)!r})"
+
+    def __getstate__(self):
+        return self._index, self._values
+
+    def __setstate__(self, state) -> None:
+        self._index, self._values = state
+
+    def to_dict(self, keys=None) -> dict:
+        """
+        returns the row as a dict, only with the given keys if provided
+        """
+        if keys is None:
+            return dict(self)
+        return {key: self[key] for key in keys}
+
+
+def make_header_index(headers) -> dict:
+    """
+    returns header -> position map of the headers
+    """
+    return {header: position for position, header in enumerate(headers)}
+
+
+class TableParser:
+    """
+    Line by line markdown table parser
+
+    tables holds {"headers", "data", "skip_rows_count"} of every heading seen so far,
+    feed returns the data rows as TableRow and doesn't add them to "data".
+    """
+
+    def __init__(self, skip_sections=()) -> None:
+        """
+        init function
+        """
+        self.skip_sections = skip_sections
+        self.tables = {}
+        # rows parsed so far per heading, empty rows are dropped only at the start of a table
+        self.row_counts = {}
+        # header index per heading, shared by the rows of the table
+        self.indexes = {}
+        self.section = None
+        self.current_table = None
+        self.skip_section = False
+
+    def feed(self, line: str):
+        """
+        parse one line, returns the row dict if it is a data row else None
+        """
+        first = line[:1]
+        if first == "#":
+            if not HEADING_PATTERN.match(line):
+                return None
+            self.current_table = None
+            table_name = line.strip("#").strip()
+            if table_name in self.skip_sections:
+                self.skip_section = True
+                return None
+            self.skip_section = False
+            self.section = table_name
+            current_table = self.tables.get(table_name)
+            if current_table is None:
+                # skip_rows_count shows the rows count that needs to be skipped.
+                # creating new table needs setting up header row, hence the row (separator row) after that will be skipped.
+                current_table = self.tables[table_name] = {"skip_rows_count": 1}
+                self.row_counts[table_name] = 0
+            else:
+                # if the table already exists, then header and separator rows needs to be skipped.
+                current_table["skip_rows_count"] = 2
+            self.current_table = current_table
+        elif first == "|" or first.isspace():
+            current_table = self.current_table
+            if self.skip_section or current_table is None:
+                return None
+            if not ROW_PATTERN.match(line):
+                return None
+            cells = tuple([cell.strip() for cell in line.strip("|").split("|")])
+            if "headers" not in current_table:
+                current_table["headers"] = [cell for cell in cells if cell]
+                current_table["data"] = []
+                index = make_header_index(current_table["headers"])
+                # rows of a table with repeated headers fall back to dicts
+                if len(index) != len(current_table["headers"]):
+                    index = None
+                self.indexes[self.section] = index
+            elif current_table["skip_rows_count"] == 0:
+                # skip_rows_count values as '0' indicates that the current row is data row
+                if self.row_counts[self.section] or any(cells):
+                    self.row_counts[self.section] += 1
+                    index = self.indexes[self.section]
+                    if index is None:
+                        return dict(zip(current_table["headers"], cells))
+                    return TableRow(index, cells)
+            else:
+                current_table["skip_rows_count"] -= 1
+        return None
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return str(value)
+
+
+def _block_to_tables(data, skip_sections, tables) -> None:
+    for heading, rows in data.items():
+        if heading in skip_sections:
+            continue
+        if isinstance(rows, dict):  # e.g. "Config Changes": {"New Configs": [...]}
+            _block_to_tables(rows, skip_sections, tables)
+            continue
+        if not isinstance(rows, list):
+            continue
+        # list sections can be given as plain values
+        rows = [row if isinstance(row, dict) else {heading: row} for row in rows]
+        headers = list(
+            dict.fromkeys(
+                itertools.chain(
+                    TEMPLATE_HEADERS.get(heading, ()),
+                    (key for row in rows for key in row),
+                )
+            )
+        )
+        index = make_header_index(headers)
+        tables[heading] = {
+            "skip_rows_count": 0,
+            "headers": headers,
+            "data": [
+                TableRow(index, tuple(_cell(row.get(header)) for header in headers))
+                for row in rows
+            ],
+        }
+
+
+def parse_fast_path_block(markdown_text, skip_sections=()):
+    """
+    Decode the build-notes json block of markdown_text, a str. See BlockScanner for streams
+
+    Returns:
+    dict, same format as markdown_tables_to_dicts, None if the block is absent or invalid
+    """
+    if not isinstance(markdown_text, str) or FAST_PATH_MARKER not in markdown_text:
+        return None
+    match = FAST_PATH_PATTERN.search(markdown_text)
+    if match is None:
+        return None
+    return decode_block(match.group(1), skip_sections)
+
+
+def decode_block(block, skip_sections=()):
+    """
+    returns the tables of the json text of a build-notes block, None if it is invalid
+    """
+    try:
+        data = json.loads(block)
+    except ValueError as err:
+        print(f"Invalid build-notes block, falling back to the tables -> {err}")
+        return None
+    if not isinstance(data, dict):
+        print(
+            "Invalid build-notes block, expected a json object. Falling back to the tables"
+        )
+        return None
+    tables = {}
+    _block_to_tables(data, skip_sections, tables)
+    return tables
+
+
+class BlockScanner:
+    """
+    Finds the build-notes block in the lines of a text stream as they are read
+
+    Line by line counterpart of parse_fast_path_block, only the first block is decoded.
+    reading is True while the lines of the block are read.
+    tables is the decoded block once it's closed, None if there is none or it is invalid.
+    """
+
+    def __init__(self, skip_sections=()) -> None:
+        """
+        init function
+        """
+        self.skip_sections = skip_sections
+        # lines of the block while it is read
+        self.block_lines = None
+        self.done = False
+        self.tables = None
+
+    @property
+    def reading(self) -> bool:
+        return self.block_lines is not None
+
+    def feed(self, line: str) -> None:
+        if self.done:
+            return
+        if self.block_lines is None:
+            if line[:1] == "`" and line.rstrip() == FAST_PATH_MARKER:
+                self.block_lines = []
+        elif line.startswith("```"):
+            self.tables = decode_block("\n".join(self.block_lines), self.skip_sections)
+            self.block_lines = None
+            self.done = True
+        else:
+            self.block_lines.append(line.rstrip("\n"))
+
+
+def dump_tables(tables) -> dict:
+    """
+    returns json serializable copy of the parsed tables, rows are stored as lists of cells
+    """
+    dumped = {}
+    for heading, table in tables.items():
+        entry = {"skip_rows_count": table["skip_rows_count"]}
+        if "headers" in table:
+            entry["headers"] = table["headers"]
+            entry["data"] = [
+                list(row._values) if isinstance(row, TableRow) else dict(row)
+                for row in table["data"]
+            ]
+        dumped[heading] = entry
+    return dumped
+
+
+def load_tables(dumped) -> dict:
+    """
+    returns the parsed tables stored by dump_tables
+    """
+    tables = {}
+    for heading, entry in dumped.items():
+        table = tables[heading] = {"skip_rows_count": entry["skip_rows_count"]}
+        if "headers" in entry:
+            table["headers"] = entry["headers"]
+            index = make_header_index(entry["headers"])
+            table["data"] = [
+                row if isinstance(row, dict) else TableRow(index, tuple(row))
+                for row in entry["data"]
+            ]
+    return tables
+
+
+def iter_lines(markdown):
+    """
+    yields the lines of markdown without their line endings
+
+    markdown can be a str, a text stream or any iterable of lines. Blank lines are
+    skipped and so is the whitespace around the whole markdown, same as str.strip(),
+    which needs a lookahead of one line.
+    """
+    if isinstance(markdown, str):
+        lines = _iter_str_lines(markdown)
+    else:
+        lines = (line.rstrip("\n") for line in markdown)
+    prev = None
+    for line in lines:
+        if not line or (line[0].isspace() and not line.strip()):
+            continue  # blank lines don't affect the parsing
+        if prev is None:
+            prev = line.lstrip()
+            continue
+        yield prev
+        prev = line
+    if prev is not None:
+        yield prev.rstrip()
+
+
+def _iter_str_lines(text):
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def _lines_to_parse(markdown, required_prefix):
+    """
+    returns the iterator of lines of the str markdown, None if it doesn't start with required_prefix
+    """
+    if not markdown:
+        return None
+    if required_prefix is not None and not markdown.startswith(required_prefix):
+        return None
+    return iter_lines(markdown)
+
+
+def _iter_rows(lines, parser):
+    if lines is None:
+        return
+    feed = parser.feed
+    for line in lines:
+        row = feed(line)
+        if row is not None:
+            yield parser.section, row
+
+
+def _iter_stream_rows(markdown, parser, scanner, required_prefix):
+    """
+    Parse a text stream or iterable of lines, yielding (section, row) as they are parsed
+
+    Lines are fed to scanner till the first table starts. If it decodes a build-notes
+    block, the rows parsed while the block was read are dropped and the rest of the
+    stream isn't read, the caller uses scanner.tables instead.
+    """
+    if not markdown:
+        return
+    lines = iter(markdown)
+    if required_prefix is not None:
+        first_line = next(lines, "")
+        if not first_line.startswith(required_prefix):
+            # no tables to parse, the build-notes block can be anywhere
+            for line in itertools.chain([first_line], lines):
+                scanner.feed(line)
+                if scanner.done:
+                    break
+            return
+        lines = itertools.chain([first_line], lines)
+    feed = parser.feed
+    scanning = True
+    # rows parsed while the block is read, it's unknown yet if they are used
+    held = []
+    for line in iter_lines(lines):
+        if scanning:
+            scanner.feed(line)
+            if scanner.done:
+                if scanner.tables is not None:
+                    return
+                scanning = False
+                yield from held
+                held = None
+        row = feed(line)
+        if row is not None:
+            if scanning and scanner.reading:
+                held.append((parser.section, row))
+            else:
+                yield parser.section, row
+        if scanning and not scanner.reading and parser.indexes:
+            # a table started, a block after it is ignored
+            scanning = False
+    if held:  # the block wasn't closed
+        yield from held
+
+
+def _block_rows(tables):
+    for section, table in tables.items():
+        for row in table["data"]:
+            yield section, row
+
+
+def iter_table_rows(markdown, skip_sections=(), required_prefix=None):
+    """
+    Parse the markdown tables of markdown, yielding the data rows as they are parsed
+
+    Params:
+    markdown: str, text stream or iterable of lines
+    skip_sections: headings whose tables are ignored, till the next heading
+    required_prefix: if set, markdown without a build-notes block & not starting with it is treated as having no tables
+
+    Yields:
+    (section, row) -> section is the heading of the table, row the TableRow of header -> cell
+    """
+    if isinstance(markdown, str):
+        tables = parse_fast_path_block(markdown, skip_sections)
+        if tables is not None:
+            yield from _block_rows(tables)
+            return
+        yield from _iter_rows(
+            _lines_to_parse(markdown, required_prefix), TableParser(skip_sections)
+        )
+        return
+    scanner = BlockScanner(skip_sections)
+    yield from _iter_stream_rows(
+        markdown, TableParser(skip_sections), scanner, required_prefix
+    )
+    if scanner.tables is not None:
+        yield from _block_rows(scanner.tables)
+
+
+def markdown_tables_to_dicts(markdown_text, skip_sections=(), required_prefix=None):
+    """
+    Parse the markdown tables of markdown_text
+
+    Params:
+    markdown_text: str, text stream or iterable of lines
+    skip_sections: headings whose tables are ignored, till the next heading
+    required_prefix: if set, text without a build-notes block & not starting with it is treated as having no tables
+
+    Returns:
+    dict, heading -> {"headers": list, "data": list of TableRow, "skip_rows_count": int}
+    A heading repeated later in the text appends its rows to the same table.
+    The build-notes json block is used instead of the tables if markdown_text has one,
+    see the module docstring for where it's looked for.
+    """
+    parser = TableParser(skip_sections)
+    if isinstance(markdown_text, str):
+        tables = parse_fast_path_block(markdown_text, skip_sections)
+        if tables is not None:
+            return tables
+        rows = _iter_rows(_lines_to_parse(markdown_text, required_prefix), parser)
+        for _, row in rows:
+            parser.current_table["data"].append(row)
+        return parser.tables
+    scanner = BlockScanner(skip_sections)
+    for section, row in _iter_stream_rows(
+        markdown_text, parser, scanner, required_prefix
+    ):
+        parser.tables[section]["data"].append(row)
+    if scanner.tables is not None:
+        return scanner.tables
+    return parser.tables
@@ -4,14 +4,43 @@ Merge build notes from the sub components and return final generated build notes
 Note: needs key2repo.json to map docker images to their github repos
 """
 import base64
+import concurrent.futures
+import functools
 import json
 import os
 from typing import Any
 
-import requests
+import http_client
+import response_cache
 from ruamel.yaml import YAML
+from sub_component_cache import MissingFile, get_sub_component_cache
 
 GIT_TOKEN = os.environ.get("GH_TOKEN", "")
+# sub component build notes downloaded & parsed in parallel
+SUB_COMPONENT_WORKERS = int(os.environ.get("SUB_COMPONENT_WORKERS", "8"))
+# "all" merges every image of releases.yaml, "changed" only the images whose version
+# differs from releases.yaml of the previous tag, "range" the changed images with all
+# their releases since the previous version
+SUB_COMPONENT_MERGE_MODE = os.environ.get("SUB_COMPONENT_MERGE_MODE", "all")
+# "true" also merges the sub components of the sub components, down the whole tree
+SUB_COMPONENT_RECURSIVE = os.environ.get("SUB_COMPONENT_RECURSIVE", "false") == "true"
+KEY2REPO_PATH = ".github/scripts/key2repo.json"
+
+
+def to_plain_data(data):
+    """
+    returns a copy of the loaded yaml data with plain dicts, lists & scalars, so it can be pickled
+    """
+    if isinstance(data, dict):
+        return {to_plain_data(k): to_plain_data(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [to_plain_data(v) for v in data]
+    if isinstance(data, bool) or data is None:
+        return data
+    for plain_type in (str, int, float):
+        if isinstance(data, plain_type):
+            return plain_type(data)
+    return data
 
 
 def download_file_from_github(
@@ -22,7 +51,14 @@ def download_file_from_github(
     github_token: str = "",
 ) -> str:
     """
-    returns file contents from github
+    returns file contents from github, None if github answers 404 and empty string if
+    it couldn't be downloaded
+
+    The 404 doesn't tell a missing file from a missing ref or a repo the token can't
+    read, see ref_exists.
+
+    Raises http_client.RateLimitError if github keeps throttling the request, so it
+    isn't mistaken for a missing file.
     """
     headers = {}
     if github_token:
@@ -30,7 +66,9 @@ def download_file_from_github(
 
     url = f"https://api.github.com/repos/{username}/{repository_name}/contents/{file_path}?ref={tag}"
     try:
-        r = requests.get(url, headers=headers)
+        r = response_cache.cached_get(url, headers=headers)
+        if r.status_code == 404:
+            return None
         r.raise_for_status()
         data = r.json()
         file_content = data["content"]
@@ -38,10 +76,31 @@ def download_file_from_github(
         if file_content_encoding == "base64":
             file_content = base64.b64decode(file_content).decode()
         return file_content
+    except http_client.RateLimitError:
+        raise
     except Exception:
         return ""
 
 
+@functools.lru_cache(maxsize=None)
+def ref_exists(repo_full_name: str, tag: str) -> bool:
+    """
+    returns True if the repo is readable with GIT_TOKEN and tag resolves to a commit in it
+
+    Raises http_client.RateLimitError if github keeps throttling the request.
+    """
+    headers = {"Accept": "application/vnd.github.sha"}
+    if GIT_TOKEN:
+        headers["Authorization"] = f"token {GIT_TOKEN}"
+    url = f"https://api.github.com/repos/{repo_full_name}/commits/{tag}"
+    try:
+        return response_cache.cached_get(url, headers=headers).status_code == 200
+    except http_client.RateLimitError:
+        raise
+    except Exception:
+        return False
+
+
 class CustomBuildNotes:
     """
     Custom build notes data format
@@ -219,7 +278,7 @@ class CustomBuildNotes:
         for e in cfgs.get("Removed", []):
             c = e["component"]
             if c not in self.removed:
-                self.deprecated_configs[c] = {}
+                self.removed[c] = {}
             for f in e["files"]:
                 if f["file"] not in self.removed[c]:
                     self.removed[c][f["file"]] = []
@@ -235,18 +294,214 @@ class CustomBuildNotes:
         for e in data["BuildNotes"].get("Dependencies", []):
             self.dependencies.add(e)
 
+    def merge(self, other: "CustomBuildNotes") -> None:
+        """
+        merge the build notes of a sub component into this one
+        """
+        for subk, subv in other.jira.items():
+            if subk in self.jira:
+                self.jira[subk][
+                    "description"
+                ] = f"{self.jira[subk]['description']}, {subv['description']}"
+                self.jira[subk][
+                    "stepstoreproduce"
+                ] = f"{self.jira[subk]['stepstoreproduce']}, {subv['stepstoreproduce']}"
+                self.jira[subk][
+                    "impacts"
+                ] = f"{self.jira[subk]['impacts']}, {subv['impacts']}"
+            else:
+                self.jira[subk] = subv
+
+        # new configs
+        for comp, deets in other.new.items():
+            if comp not in self.new:
+                self.new[comp] = {}
+            for f, fdeets in deets.items():
+                if f not in self.new[comp]:
+                    self.new[comp][f] = []
+                self.new[comp][f].extend(fdeets)
+
+        # changed configs
+        for comp, deets in other.changed.items():
+            if comp not in self.changed:
+                self.changed[comp] = {}
+            for f, fdeets in deets.items():
+                if f not in self.changed[comp]:
+                    self.changed[comp][f] = []
+                self.changed[comp][f].extend(fdeets)
+
+        # deprecated_configs configs
+        for comp, deets in other.deprecated_configs.items():
+            if comp not in self.deprecated_configs:
+                self.deprecated_configs[comp] = {}
+            for f, fdeets in deets.items():
+                if f not in self.deprecated_configs[comp]:
+                    self.deprecated_configs[comp][f] = []
+                self.deprecated_configs[comp][f].extend(fdeets)
+
+        # removed configs
+        for comp, deets in other.removed.items():
+            if comp not in self.removed:
+                self.removed[comp] = {}
+            for f, fdeets in deets.items():
+                if f not in self.removed[comp]:
+                    self.removed[comp][f] = []
+                self.removed[comp][f].extend(fdeets)
+
+        for d in other.limitations:
+            self.limitations.add(d)
+        for d in other.deprecated_features:
+            self.deprecated_features.add(d)
+        for d in other.dependencies:
+            self.dependencies.add(d)
+
+
+def get_previous_tag(tag: str, path: str = "taglist.yaml") -> str:
+    """
+    returns the last tag of taglist.yaml before tag, empty string if there is none
+    """
+    try:
+        with open(path, mode="r", encoding="utf-8") as fh:
+            tags = [str(t) for t in YAML().load(fh)["Tag List"]]
+    except Exception as err:
+        print(f"Failed reading {path} -> {err}")
+        return ""
+    # the current tag is already added to taglist.yaml when the build notes are
+    # generated, once more by every rerun on the rc-build-notes-<tag> branch
+    while tags and tags[-1] == tag:
+        tags.pop()
+    return tags[-1] if tags else ""
+
+
+def load_repo_file(repo_full_name: str, tag: str, file_path: str):
+    """
+    returns the loaded yaml or json file of the repo at tag, None if it couldn't be downloaded
+    """
+    cache = get_sub_component_cache()
+    if cache is not None:
+        data = cache.get(repo_full_name, tag, file_path)
+        if isinstance(data, MissingFile):
+            return None
+        if data is not None:
+            return data
+    username, repo = repo_full_name.split("/")
+    file_data = download_file_from_github(username, repo, tag, file_path, GIT_TOKEN)
+    if file_data is None and cache is not None:
+        cache.set_missing(
+            repo_full_name, tag, file_path, ref_exists(repo_full_name, tag)
+        )
+    if not file_data:
+        return None
+    try:
+        if file_path.endswith(".json"):
+            data = json.loads(file_data) or {}
+        else:
+            data = to_plain_data(YAML().load(file_data)) or {}
+    except Exception as err:
+        print(f"Failed loading {file_path} of {repo_full_name}@{tag} -> {err}")
+        return None
+    if cache is not None:
+        cache.set(repo_full_name, tag, file_path, data)
+    return data
+
+
+def get_release_range(repo_full_name: str, old_tag: str, new_tag: str) -> list[str]:
+    """
+    returns the tags of the repo released after old_tag up to new_tag, in release order
+
+    The tags are read from taglist.yaml of the repo at new_tag, [new_tag] is returned
+    if the range can't be found there.
+    """
+    data = load_repo_file(repo_full_name, new_tag, "taglist.yaml") or {}
+    tags = [str(t) for t in data.get("Tag List") or []]
+    if old_tag in tags and new_tag in tags:
+        start, end = tags.index(old_tag), tags.index(new_tag)
+        if start < end:
+            return tags[start + 1 : end + 1]
+    print(f"No release range of {repo_full_name} from {old_tag} to {new_tag}")
+    return [new_tag]
+
+
+def load_sub_component(component: str, repo_full_name: str, tag: str):
+    """
+    returns the CustomBuildNotes of the build_notes.yaml of the repo at tag, None if it has none
+
+    Parsed build notes are cached by repo & tag, see sub_component_cache.
+    """
+    cache = get_sub_component_cache()
+    if cache is not None:
+        obj = cache.get(repo_full_name, tag, "build_notes.yaml")
+        if isinstance(obj, MissingFile):
+            print(f"No build notes for {component} -> {tag}")
+            return None
+        if obj is not None:
+            return obj
+    username, repo = repo_full_name.split("/")
+    file_data = download_file_from_github(
+        username, repo, tag, "build_notes.yaml", GIT_TOKEN
+    )
+    if file_data is None and cache is not None:
+        cache.set_missing(
+            repo_full_name, tag, "build_notes.yaml", ref_exists(repo_full_name, tag)
+        )
+    if not file_data:
+        print(f"No build notes for {component} -> {tag}")
+        return None
+    obj = CustomBuildNotes()
+    # YAML instances aren't thread safe, each call uses its own
+    obj.actual_to_custom(to_plain_data(YAML().load(file_data)))
+    if cache is not None:
+        cache.set(repo_full_name, tag, "build_notes.yaml", obj)
+    return obj
+
+
+def load_component_node(component: str, repo_full_name: str, tag: str):
+    """
+    returns the build notes of the repo at tag & the (component, repo, tag) of its own
+    sub components, read from its releases.yaml & key2repo.json at tag
+
+    Returns:
+    (CustomBuildNotes or None, list of (component, repo, tag))
+    """
+    notes = load_sub_component(component, repo_full_name, tag)
+    rls_data = load_repo_file(repo_full_name, tag, "releases.yaml") or {}
+    images = rls_data.get("dockerImages") or {}
+    if not images:
+        return notes, []
+    k2r = load_repo_file(repo_full_name, tag, KEY2REPO_PATH) or {}
+    k2r = k2r.get("dockerImages") or {}
+    children = [(k, k2r[k], v.split(":")[-1]) for k, v in images.items() if k in k2r]
+    return notes, children
+
 
 class MergeBuildNotes:
     """
     Merge build notes of the current repo with it's sub components, if they exist
     """
 
-    def __init__(self, tag: str):
+    def __init__(
+        self,
+        tag: str,
+        repo: str = None,
+        changed_only: bool = SUB_COMPONENT_MERGE_MODE in ("changed", "range"),
+        merge_range: bool = SUB_COMPONENT_MERGE_MODE == "range",
+        recursive: bool = SUB_COMPONENT_RECURSIVE,
+    ):
         """
         init function
+
+        repo is the org/repo of the current repo, GITHUB_REPOSITORY if not provided.
+        If changed_only, only the images whose version changed since the previous tag
+        are merged. If merge_range, all the releases of a changed image since its
+        previous version are merged, implies changed_only. If recursive, the sub
+        components of the sub components are merged too, see iter_component_tree.
         """
         self.yaml: YAML = YAML()
         self.tag: str = tag
+        self.repo: str = repo or os.environ.get("GITHUB_REPOSITORY", "")
+        self.changed_only: bool = changed_only or merge_range
+        self.merge_range: bool = merge_range
+        self.recursive: bool = recursive
         with open("build_notes.yaml", mode="r", encoding="utf-8") as fh:
             self.data = self.yaml.load(fh)
         if os.path.exists("releases.yaml") and os.path.isfile("releases.yaml"):
@@ -255,12 +510,162 @@ class MergeBuildNotes:
         else:
             self.rls_data: Any = {}
 
+    def get_previous_images(self):
+        """
+        returns dockerImages of releases.yaml at the previous tag, None if it can't be loaded
+        """
+        previous_tag = get_previous_tag(self.tag)
+        if not previous_tag or not self.repo:
+            print("No previous tag or repo to compare the images with")
+            return None
+        data = load_repo_file(self.repo, previous_tag, "releases.yaml")
+        if data is None:
+            print(f"Failed getting releases.yaml of {previous_tag}")
+            return None
+        print(f"Comparing the images with {previous_tag}")
+        return data.get("dockerImages") or {}
+
+    def get_sub_component_refs(self) -> list[tuple[str, str, str]]:
+        """
+        returns (component, repo, tag) of the docker images of releases.yaml that have a
+        repo in key2repo.json, in the order of releases.yaml
+
+        If changed_only, images with the same version as in the previous tag are left
+        out. All the images are returned if the previous releases.yaml can't be loaded.
+        If merge_range, a changed image has one entry per release since its previous
+        version, in release order.
+        """
+        with open(KEY2REPO_PATH, mode="r", encoding="utf-8") as fh:
+            k2r = json.load(fh)
+            k2r = k2r["dockerImages"]
+        previous_images = self.get_previous_images() if self.changed_only else None
+        images = []
+        for k, v in self.rls_data["dockerImages"].items():
+            if k not in k2r:
+                continue
+            previous = previous_images.get(k) if previous_images is not None else None
+            if previous == v:
+                print(f"Skipping {k} as it is unchanged -> {v}")
+                continue
+            old_tag = previous.split(":")[-1] if previous else None
+            images.append((k, k2r[k], old_tag, v.split(":")[-1]))
+        if not self.merge_range:
+            return [(k, repo, tag) for k, repo, _, tag in images]
+        # taglist.yaml of the changed images are read in parallel
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(SUB_COMPONENT_WORKERS, len(images)))
+        ) as executor:
+            ranges = list(
+                executor.map(
+                    lambda image: (
+                        get_release_range(image[1], image[2], image[3])
+                        if image[2]
+                        else [image[3]]
+                    ),
+                    images,
+                )
+            )
+        refs = []
+        for (k, repo, _, _), tags in zip(images, ranges):
+            if len(tags) > 1:
+                print(f"Merging releases {tags} of {k}")
+            refs.extend((k, repo, tag) for tag in tags)
+        return refs
+
+    def iter_sub_components(self, max_workers: int = SUB_COMPONENT_WORKERS):
+        """
+        Download & parse the sub components' build notes in a thread pool
+
+        Yields (component, CustomBuildNotes) in the order of releases.yaml, each one as
+        soon as it and all the components before it are ready. Components without
+        build notes are skipped.
+        """
+        refs = self.get_sub_component_refs()
+        if not refs:
+            return
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(refs)))
+        ) as executor:
+            futures = {
+                executor.submit(load_sub_component, *ref): index
+                for index, ref in enumerate(refs)
+            }
+            # results that arrived before the ones ahead of them in releases.yaml
+            ready = {}
+            next_index = 0
+            for future in concurrent.futures.as_completed(futures):
+                ready[futures[future]] = future.result()
+                while next_index in ready:
+                    obj = ready.pop(next_index)
+                    if obj is not None:
+                        yield refs[next_index][0], obj
+                    next_index += 1
+
+    def iter_component_tree(self, max_workers: int = SUB_COMPONENT_WORKERS):
+        """
+        Resolve the whole sub component tree in a thread pool
+
+        The sub components of get_sub_component_refs are loaded with their own sub
+        components, found in their releases.yaml & key2repo.json, down the tree.
+        Each (repo, tag) is loaded once however many components depend on it, and a
+        component depending on one of its ancestors is reported & not followed.
+
+        Yields (component, CustomBuildNotes) once the tree is resolved, each (repo, tag)
+        once, depth first in the order of the releases.yaml files.
+        """
+        refs = self.get_sub_component_refs()
+        if not refs:
+            return
+        root = (self.repo, self.tag)
+        # (repo, tag) -> future of load_component_node, this repo's notes are already in
+        # build_notes.yaml
+        nodes = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            to_submit = list(refs)
+            while to_submit or pending:
+                for ref in to_submit:
+                    key = (ref[1], ref[2])
+                    if key not in nodes and key != root:
+                        nodes[key] = executor.submit(load_component_node, *ref)
+                        pending.add(nodes[key])
+                to_submit = []
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    to_submit.extend(future.result()[1])
+        visited = set()
+        # repos & tags of the current path of the tree, starting at this repo
+        path = [root]
+        stack = [iter(refs)]
+        while stack:
+            ref = next(stack[-1], None)
+            if ref is None:
+                stack.pop()
+                path.pop()
+                continue
+            key = (ref[1], ref[2])
+            if key in path:
+                cycle = " -> ".join(f"{repo}@{tag}" for repo, tag in path + [key])
+                print(f"Dependency cycle, not following {ref[0]}: {cycle}")
+                continue
+            if key in visited:
+                continue
+            visited.add(key)
+            notes, children = nodes[key].result()
+            if notes is not None:
+                yield ref[0], notes
+            path.append(key)
+            stack.append(iter(children))
+
     def get_sub_components(self) -> dict[str, CustomBuildNotes]:
         """
         Get the sub components details and return map of those details
 
         Gets the sub components list from repo root by reading releases.yaml.
-        Download build_notes.yaml from the repo and create the sub component map.
+        Download build_notes.yaml from the repo and create the sub component map,
+        see iter_sub_components. Multiple releases of a component are merged into one.
 
         Args:
 
@@ -277,29 +682,15 @@ class MergeBuildNotes:
             }
         """
         res = {}
-        with open(".github/scripts/key2repo.json", mode="r", encoding="utf-8") as fh:
-            k2r = json.load(fh)
-            k2r = k2r["dockerImages"]
-        for k, v in self.rls_data["dockerImages"].items():
-            if k not in k2r:
-                continue
-            repo = k2r[k]
-            username, repo = repo.split("/")
-            tag = v.split(":")[-1]
-            file_data = download_file_from_github(
-                username, repo, tag, "build_notes.yaml", GIT_TOKEN
-            )
-            if not file_data:
-                print(f"No build notes for {k} -> {tag}")
-                continue
-            file_data_dict = self.yaml.load(file_data)
-            obj = CustomBuildNotes()
-            obj.actual_to_custom(file_data_dict)
-            res[k] = obj
+        for k, obj in self.iter_sub_components():
+            if k in res:
+                res[k].merge(obj)
+            else:
+                res[k] = obj
         return res
 
     def merge_sub_components(
-        self, data: dict[str, CustomBuildNotes]
+        self, data: dict[str, CustomBuildNotes] = None
     ) -> CustomBuildNotes:
         """
         Merge sub components' build notes with the current repo's build notes
@@ -308,6 +699,9 @@ class MergeBuildNotes:
         returns the final dict that can be dumped to build_notes.yaml
 
         Args:
+            data: sub component map or iterable of (component, CustomBuildNotes), the
+            sub components are downloaded with iter_sub_components and merged as they
+            arrive if not provided, or with iter_component_tree if recursive
 
         Returns:
             A dict with the format expected by the build_notes file
@@ -316,64 +710,14 @@ class MergeBuildNotes:
             d = self.yaml.load(fh)
         final_obj = CustomBuildNotes()
         final_obj.actual_to_custom(d)
-        for _, v in data.items():
-            for subk, subv in v.jira.items():
-                if subk in final_obj.jira:
-                    final_obj.jira[subk][
-                        "description"
-                    ] = f"{final_obj.jira[subk]['description']}, {subv['description']}"
-                    final_obj.jira[subk][
-                        "stepstoreproduce"
-                    ] = f"{final_obj.jira[subk]['stepstoreproduce']}, {subv['stepstoreproduce']}"
-                    final_obj.jira[subk][
-                        "impacts"
-                    ] = f"{final_obj.jira[subk]['impacts']}, {subv['impacts']}"
-                else:
-                    final_obj.jira[subk] = subv
-
-            # new configs
-            for comp, deets in v.new.items():
-                if comp not in final_obj.new:
-                    final_obj.new[comp] = {}
-                for f, fdeets in deets.items():
-                    if f not in final_obj.new[comp]:
-                        final_obj.new[comp][f] = []
-                    final_obj.new[comp][f].extend(fdeets)
-
-            # changed configs
-            for comp, deets in v.changed.items():
-                if comp not in final_obj.changed:
-                    final_obj.changed[comp] = {}
-                for f, fdeets in deets.items():
-                    if f not in final_obj.changed[comp]:
-                        final_obj.changed[comp][f] = []
-                    final_obj.changed[comp][f].extend(fdeets)
-
-            # deprecated_configs configs
-            for comp, deets in v.deprecated_configs.items():
-                if comp not in final_obj.deprecated_configs:
-                    final_obj.deprecated_configs[comp] = {}
-                for f, fdeets in deets.items():
-                    if f not in final_obj.deprecated_configs[comp]:
-                        final_obj.deprecated_configs[comp][f] = []
-                    final_obj.deprecated_configs[comp][f].extend(fdeets)
-
-            # removed configs
-            for comp, deets in v.removed.items():
-                if comp not in final_obj.removed:
-                    final_obj.removed[comp] = {}
-                for f, fdeets in deets.items():
-                    if f not in final_obj.removed[comp]:
-                        final_obj.removed[comp][f] = []
-                    final_obj.removed[comp][f].extend(fdeets)
-
-            for d in v.limitations:
-                final_obj.limitations.add(d)
-            for d in v.deprecated_features:
-                final_obj.deprecated_features.add(d)
-            for d in v.dependencies:
-                final_obj.dependencies.add(d)
-
+        if data is None and self.recursive:
+            data = self.iter_component_tree()
+        elif data is None:
+            data = self.iter_sub_components()
+        elif isinstance(data, dict):
+            data = data.items()
+        for _, v in data:
+            final_obj.merge(v)
         return final_obj
 
 
@@ -387,8 +731,7 @@ def main():
     if not obj.rls_data:
         # if no releases file, return
         return
-    sub_components = obj.get_sub_components()
-    final_data = obj.merge_sub_components(sub_components)
+    final_data = obj.merge_sub_components()
     final_dumpable_data = final_data.custom_to_actual()
     with open("build_notes.yaml", mode="w", encoding="utf-8") as fh:
         yaml.dump(final_dumpable_data, fh)
@@ -1,98 +1,36 @@
-import concurrent.futures
 import json
 import os
-import re
 import sys
 
+import markdown_parser
 from jira import Jira
+from jira_cache import get_jira_cache
+from patterns import compile_patterns, load_pattern_set
 
 BUILD_NOTES_PR_BRANCH_FORMAT = "rc-build-notes-"
 REVERT_PR_BRANCH_FORMAT = "revert-"
 
 
-def check_if_jira_exists(password, issue_id):
-    jira = Jira(password)
-    response = jira.get(issue_id)
-    if not response:
-        return False
-    return True
-
-
 def thread_execution_for_jira(password, issue_list):
-    return_list = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_item = {
-            executor.submit(check_if_jira_exists, password, item): item
-            for item in issue_list
-        }
-        for future in concurrent.futures.as_completed(future_to_item):
-            item = future_to_item[future]
-            try:
-                data = future.result()
-            except Exception as err:
-                print(f"Failed getting data for {item} with error {err}")
-            else:
-                if data:
-                    return_list.append(item)
-                else:
-                    print(f"No jira info for id {item}, exiting ...")
-                    sys.exit(1)
-    return return_list
+    """
+    returns the list of issues that exist, exits if any of the issues doesn't exist
+    """
+    jira = Jira(password, cache=get_jira_cache())
+    try:
+        issues, missing = jira.get_summaries(issue_list)
+    except Exception as err:
+        print(f"Failed getting data for {issue_list} with error {err}")
+        return []
+    if missing:
+        print(f"No jira info for ids {missing}, exiting ...")
+        sys.exit(1)
+    return [item for item in issue_list if item in issues]
 
 
 def markdown_tables_to_dicts(markdown_text):
-    tables = {}
-    current_table = None
-    lines = markdown_text.strip().split("\n")
-    skip_section = False
-    for line in lines:
-        if re.match(r"^#+\s+\w+", line):  # Check for headings
-            current_table = None
-            table_name = line.strip("#").strip()
-            if table_name == "Additional Info":
-                skip_section = True
-                continue
-            else:
-                skip_section = False
-            if table_name not in tables:
-                tables[table_name] = {}
-                # skip_rows_count variable shows the rows count that needs to be skipped.
-                # creating new table needs setting up header row, hence the row (separator row) after that will be skipped.
-                tables[table_name]["skip_rows_count"] = 1
-            else:
-                # if the table already exists, then header and separator rows needs to be skipped.
-                tables[table_name]["skip_rows_count"] = 2
-            current_table = tables[table_name]
-        elif re.match(r"^\s*\|.*\|\s*$", line):  # Check for table rows
-            if not skip_section:
-                if current_table is not None:
-                    if "headers" not in current_table:
-                        current_table["headers"] = [
-                            header.strip()
-                            for header in line.strip("|").split("|")
-                            if header.strip()
-                        ]
-                        current_table["data"] = []
-                    else:
-                        # skip_rows_count values as '0' indicates that the current row is data row
-                        if current_table["skip_rows_count"] == 0:
-                            row_data = [
-                                data.strip() for data in line.strip("|").split("|")
-                            ]
-                            if current_table["data"] or any(
-                                cell.strip() for cell in row_data
-                            ):
-                                current_table["data"].append(
-                                    dict(zip(current_table["headers"], row_data))
-                                )
-                        else:
-                            current_table["skip_rows_count"] -= 1
-    # Not required, skip_rows_count will take care of removing separator row
-    # Remove the first data entry (separator row) from each table
-    # for table in tables.values():
-    #     if table.get('data'):
-    #         del table['data'][0]
-    return tables
+    return markdown_parser.markdown_tables_to_dicts(
+        markdown_text, skip_sections=("Additional Info",)
+    )
 
 
 def execute_action_based_on_branch(
@@ -122,18 +60,12 @@ def execute_action_based_on_branch(
         BUILD_NOTES_PR_BRANCH_FORMAT
     ):  # skip check for build notes pr
         return False, True
-    for pre in prefix_branches:
-        if base_branch.startswith(pre):
-            print(f"Matches with prefix -> {pre}")
-            return True, False
-    for suf in suffix_branches:
-        if base_branch.endswith(suf):
-            print(f"Matches with suffix -> {suf}")
-            return True, False
-    for pattern in contain_branches:
-        if pattern in base_branch:
-            print(f"Matches with pattern -> {pattern}")
-            return True, False
+    match = compile_patterns(
+        tuple(prefix_branches), tuple(suffix_branches), tuple(contain_branches)
+    ).search(base_branch)
+    if match is not None:
+        print(f"Matches with pattern -> {match.group()}")
+        return True, False
     return False, False
 
 
@@ -145,6 +77,7 @@ def validate_branches():
     contain_branches -> format +*(branch_contains_string)*
 
     Exits if branch format doesn't start with "+" or unknown format.
+    The config is read & compiled once per process, see patterns.load_pattern_set.
 
     Params:
     None
@@ -156,49 +89,20 @@ def validate_branches():
     contain_branches -> list
     is_it_plus -> bool, will be True if the prefix '+', else False for '-'
     """
-    prefix_branches, suffix_branches, contain_branches = [], [], []
-    with open(
-        ".github/scripts/build_notes_configs.json", mode="r", encoding="utf-8"
-    ) as fh:
-        data = json.load(fh)
-    branches = [x.strip() for x in data["branch_pattern"].split()]
-    if not branches:
+    try:
+        pattern_set = load_pattern_set("branch_pattern", kind="branch")
+    except ValueError as err:
+        print(err)
+        sys.exit(1)
+    if pattern_set is None:
         print("No branches provided, skipping checks...")
         sys.exit(0)
-    is_it_plus = False
-    symbol = ""
-    if branches[0].startswith("+"):
-        symbol = "+"
-        is_it_plus = True
-    elif branches[0].startswith("-"):
-        symbol = "-"
-        is_it_plus = False
-    else:
-        print(f"Unknown branch format -> {branches[0]}")
-        sys.exit(1)
-    for branch in branches:
-        if not branch.startswith(symbol):
-            print(
-                f"All the branches should be starting with the same prefix: {symbol}, error -> {branch}"
-            )
-            sys.exit(1)
-        each_branch = branch[1:]  # ignore + in the beginning
-        if each_branch[0] == "*" and each_branch[-1] == "*":  # format -> +*(branch)*
-            contain_branches.append(
-                each_branch[each_branch.find("(") + 1 : each_branch.find(")")]
-            )
-        elif each_branch[0] == "*":  # format -> +*(branch)
-            suffix_branches.append(
-                each_branch[each_branch.find("(") + 1 : each_branch.find(")")]
-            )
-        elif each_branch[-1] == "*":  # format -> +(branch)*
-            prefix_branches.append(
-                each_branch[each_branch.find("(") + 1 : each_branch.find(")")]
-            )
-        else:
-            print(f"Unknown branch format -> {branch}")
-            sys.exit(1)
-    return prefix_branches, suffix_branches, contain_branches, is_it_plus
+    return (
+        pattern_set.prefixes,
+        pattern_set.suffixes,
+        pattern_set.contains,
+        pattern_set.is_it_plus,
+    )
 
 
 def skip_after_validating_description(body: str) -> bool:
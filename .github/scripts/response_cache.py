@@ -0,0 +1,168 @@
+"""
+On disk cache of github rest responses using conditional requests
+
+Stores the ETag / Last-Modified of every cached response and sends them back as
+If-None-Match / If-Modified-Since. Github answers 304 for unchanged resources and
+304s don't count against the rate limit, so reruns of the workflow mostly read
+from the cache.
+
+The cache directory can be persisted between workflow runs with actions/cache,
+see BUILD_NOTES_CACHE_DIR.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import http_client
+
+# root directory of the caches used by the build notes scripts, empty disables them
+BUILD_NOTES_CACHE_DIR = os.environ.get(
+    "BUILD_NOTES_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "build_notes"),
+)
+# least recently used responses are evicted once the cache grows beyond this size
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(200 * 1024**2)))
+
+
+def evict_least_recently_used(path: str, size: int, max_bytes: int) -> int:
+    """
+    remove the least recently used files of the cache directory at path, until its
+    size is within 90% of max_bytes. Reading an entry should update its mtime
+
+    Returns:
+    int, size of the directory after the eviction
+    """
+    entries = []
+    for f in os.listdir(path):
+        entry_path = os.path.join(path, f)
+        try:
+            stat = os.stat(entry_path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry_path))
+    entries.sort()
+    for _, entry_size, entry_path in entries:
+        if size <= max_bytes * 0.9:
+            break
+        try:
+            os.remove(entry_path)
+            size -= entry_size
+        except OSError:
+            continue
+    return size
+
+
+class ResponseCache:
+    """
+    Conditional request cache, one json file per url
+    """
+
+    def __init__(self, path: str, max_bytes: int = HTTP_CACHE_MAX_BYTES) -> None:
+        """
+        init function
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        self.size = sum(
+            os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path)
+        )
+
+    def _entry_path(self, url: str, headers: dict) -> str:
+        # responses differ based on the media type asked for
+        key = f"{url}\n{headers.get('Accept', '')}"
+        return os.path.join(
+            self.path, f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+        )
+
+    def _load(self, entry_path: str) -> dict:
+        try:
+            with open(entry_path, mode="r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, entry_path: str, entry: dict) -> None:
+        data = json.dumps(entry)
+        with self.lock:
+            if os.path.exists(entry_path):
+                self.size -= os.path.getsize(entry_path)
+            tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode="w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp_path, entry_path)
+            self.size += os.path.getsize(entry_path)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        self.size = evict_least_recently_used(self.path, self.size, self.max_bytes)
+
+    def get(self, url: str, headers: dict = None, **kwargs):
+        """
+        GET url through the shared http client, revalidating the cached copy if one exists
+
+        Returns the requests.Response. A 304 response is returned with the status code
+        and content of the cached response, so callers can't tell it from a 200.
+        """
+        headers = dict(headers or {})
+        entry_path = self._entry_path(url, headers)
+        entry = self._load(entry_path)
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        elif entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = http_client.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            response.status_code = entry["status_code"]
+            response._content = entry["content"].encode()
+            response.encoding = "utf-8"
+            try:
+                os.utime(entry_path)  # mark as recently used
+            except OSError:
+                pass
+            return response
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            self._store(
+                entry_path,
+                {
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "status_code": response.status_code,
+                    "content": response.text,
+                },
+            )
+        return response
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    returns the shared response cache, None if caching is disabled
+    """
+    global _response_cache
+    if not BUILD_NOTES_CACHE_DIR:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(os.path.join(BUILD_NOTES_CACHE_DIR, "http"))
+    return _response_cache
+
+
+def cached_get(url: str, **kwargs):
+    """
+    GET url through the shared response cache, or directly if caching is disabled
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return http_client.get(url, **kwargs)
+    return cache.get(url, **kwargs)
@@ -5,7 +5,7 @@ Util functions
 import base64
 import os
 
-import requests
+import http_client
 
 
 def github_read_file(org, repo, file_path, tag_name, github_token=None):
@@ -19,7 +19,7 @@ def github_read_file(org, repo, file_path, tag_name, github_token=None):
     url = (
         f"https://api.github.com/repos/{org}/{repo}/contents/{file_path}?ref={tag_name}"
     )
-    r = requests.get(url, headers=headers)
+    r = http_client.get(url, headers=headers)
     r.raise_for_status()
     data = r.json()
     file_content = data["content"]
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Merge time ledger of the build notes
+
+Every merged pr is parsed when it merges and appended as one json line to the
+ledger file of its base branch:
+{"pr": 12, "merged_at": "...", "tables": {...}, "summaries": {...}}
+tables are the parsed pr tables (see markdown_parser.dump_tables) and summaries the
+jira summaries of its comma separated jira ids, both empty for a pr without build
+notes tables. At tag time create_build_notes reduces the pending entries without
+fetching any pr.
+
+Once the tag is cut, compact folds the released entries into one line, along with
+the number of the build notes pr of the tag:
+{"tag": "v1.2.0", "prs": [12, 13], "build_notes_pr": 14}
+
+Usage:
+python build_notes_ledger.py append [ledger_path]
+python build_notes_ledger.py compact <tag> [released_ledger_path] [ledger_path]
+"""
+
+import json
+import os
+import sys
+
+import markdown_parser
+from patterns import load_pattern_set
+
+# ledger file, relative to the repo root
+BUILD_NOTES_LEDGER = os.environ.get("BUILD_NOTES_LEDGER", "build_notes_ledger.jsonl")
+BUILD_NOTES_PR_BRANCH_FORMAT = "rc-build-notes-"
+
+
+def read_ledger(path: str = BUILD_NOTES_LEDGER) -> list:
+    """
+    returns the entries of the ledger, an empty list if it doesn't exist
+    """
+    entries = []
+    try:
+        with open(path, mode="r", encoding="utf-8") as fh:
+            for line_number, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError as err:
+                    print(f"Skipping invalid ledger line {line_number} -> {err}")
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def pending_entries(entries) -> dict:
+    """
+    returns map of pr number to its entry, for the prs that aren't part of a compacted tag
+
+    Prs are in the order they were first appended.
+    """
+    released = set()
+    for entry in entries:
+        if "tag" in entry:
+            released.update(entry["prs"])
+    pending = {}
+    for entry in entries:
+        if "pr" in entry and entry["pr"] not in released:
+            pending[entry["pr"]] = entry
+    return pending
+
+
+def load_pending(path: str = BUILD_NOTES_LEDGER):
+    """
+    returns the pending prs of the ledger, as expected by generate_build_notes
+
+    Returns:
+    (final_dict, summaries) -> pr number -> parsed tables, jira id -> summary
+    """
+    final_dict = {}
+    summaries = {}
+    for pr_number, entry in pending_entries(read_ledger(path)).items():
+        if not entry["tables"]:
+            continue
+        final_dict[pr_number] = markdown_parser.load_tables(entry["tables"])
+        summaries.update(entry.get("summaries", {}))
+    return final_dict, summaries
+
+
+def recorded_prs(entries) -> set:
+    """
+    returns the pr numbers the ledger knows of, pending, released or build notes prs
+    """
+    prs = set()
+    for entry in entries:
+        if "pr" in entry:
+            prs.add(entry["pr"])
+        if "tag" in entry:
+            prs.update(entry["prs"])
+            if entry.get("build_notes_pr") is not None:
+                prs.add(entry["build_notes_pr"])
+    return prs
+
+
+def append_entry(entry: dict, path: str = BUILD_NOTES_LEDGER) -> None:
+    with open(path, mode="a", encoding="utf-8") as fh:
+        fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def append_pr(pull_request: dict, path: str = BUILD_NOTES_LEDGER) -> bool:
+    """
+    Parse the merged pr of a pull_request event payload and append it to the ledger
+
+    Returns:
+    bool, True if an entry was appended
+    """
+    # imported here as create_build_notes reads the ledger through this module
+    from create_build_notes import (
+        collect_jira_ids,
+        markdown_tables_to_dicts,
+        resolve_jira_summaries,
+    )
+
+    pr_number = pull_request["number"]
+    if pull_request["head"]["ref"].startswith(BUILD_NOTES_PR_BRANCH_FORMAT):
+        print("Skipping build notes pr")
+        return False
+    if pr_number in {entry.get("pr") for entry in read_ledger(path)}:
+        print(f"pr {pr_number} is already in the ledger")
+        return False
+    tables = markdown_tables_to_dicts(pull_request["body"])
+    if tables:
+        summaries = resolve_jira_summaries(collect_jira_ids({pr_number: tables}))
+    else:
+        # still recorded, so the tag time check knows the pr wasn't missed
+        print(f"pr {pr_number} has no build notes tables")
+        summaries = {}
+    append_entry(
+        {
+            "pr": pr_number,
+            "merged_at": pull_request.get("merged_at"),
+            "tables": markdown_parser.dump_tables(tables),
+            "summaries": summaries,
+        },
+        path,
+    )
+    print(f"Added pr {pr_number} to {path}")
+    return True
+
+
+def compact(
+    tag: str, released_prs=None, path: str = BUILD_NOTES_LEDGER, build_notes_pr=None
+) -> list:
+    """
+    Fold the pending entries of the ledger into a single line for tag
+
+    released_prs are the pr numbers the tag's build notes were generated from, all the
+    pending prs if not given. Entries of prs merged after that stay pending.
+    build_notes_pr is the number of the merged build notes pr of the tag.
+
+    Returns:
+    list of the folded pr numbers
+    """
+    entries = read_ledger(path)
+    pending = pending_entries(entries)
+    if released_prs is not None:
+        released = set(released_prs)
+        released_prs = [pr_number for pr_number in pending if pr_number in released]
+    else:
+        released_prs = list(pending)
+    if not released_prs:
+        print(f"No pending ledger entries to compact for {tag}")
+        return []
+    folded = set(released_prs)
+    kept = [entry for entry in entries if entry.get("pr") not in folded]
+    kept.append({"tag": tag, "prs": released_prs, "build_notes_pr": build_notes_pr})
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w", encoding="utf-8") as fh:
+        for entry in kept:
+            fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+    print(f"Compacted {len(released_prs)} ledger entries into {tag}")
+    return released_prs
+
+
+def read_event_pull_request():
+    """
+    returns the pull_request of the event at GITHUB_EVENT_PATH, None if there is no event
+    """
+    event_path = os.getenv("GITHUB_EVENT_PATH")
+    if not event_path or not os.path.isfile(event_path):
+        return None
+    with open(event_path, mode="r", encoding="utf-8") as fh:
+        return json.load(fh).get("pull_request")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("append", "compact"):
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == "append":
+        path = sys.argv[2] if len(sys.argv) > 2 else BUILD_NOTES_LEDGER
+        event_path = os.getenv("GITHUB_EVENT_PATH")
+        if not event_path or not os.path.isfile(event_path):
+            print(f"Invalid event path : {event_path}")
+            sys.exit(1)
+        pull_request = read_event_pull_request()
+        if not pull_request or not pull_request.get("merged"):
+            print("Skipping as the pr isn't merged")
+            sys.exit(0)
+        pattern_set = load_pattern_set("branch_pattern", kind="branch")
+        base_branch = pull_request["base"]["ref"]
+        if pattern_set is not None and not pattern_set.should_run(base_branch):
+            print(f"Skipping as build notes aren't generated for {base_branch}")
+            sys.exit(0)
+        append_pr(pull_request, path)
+    else:
+        if len(sys.argv) < 3:
+            print(__doc__)
+            sys.exit(1)
+        tag = sys.argv[2]
+        released_prs = None
+        if len(sys.argv) > 3:
+            released_prs = list(pending_entries(read_ledger(sys.argv[3])))
+        path = sys.argv[4] if len(sys.argv) > 4 else BUILD_NOTES_LEDGER
+        # the build notes pr when run for its merge
+        pull_request = read_event_pull_request()
+        build_notes_pr = pull_request["number"] if pull_request else None
+        compact(tag, released_prs, path, build_notes_pr)
+
+
+if __name__ == "__main__":
+    main()
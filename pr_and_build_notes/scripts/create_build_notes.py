@@ -1,18 +1,50 @@
 #!/usr/bin/env python3
 
-import json
+import concurrent.futures
+import itertools
 import os
-import re
 import sys
-from collections import defaultdict
-
-import requests
+from collections import defaultdict, deque
+from typing import NamedTuple
+
+import http_client
+import markdown_parser
+import response_cache
+from build_notes_ledger import (
+    BUILD_NOTES_LEDGER,
+    load_pending,
+    read_ledger,
+    recorded_prs,
+)
+from build_notes_state import BUILD_NOTES_STATE, BuildNotesState
 from jira import Jira
+from jira_cache import get_jira_cache
 from pr_body_validatior import execute_action_based_on_branch, validate_branches
 from merge_build_notes import MergeBuildNotes
+from patterns import compile_patterns, load_pattern_set
 from ruamel.yaml import YAML
 
 GH_TOKEN = os.environ.get("GH_TOKEN", None)
+# "github" lists & fetches the prs of the release from github, "ledger" reduces the
+# prs appended to the merge time ledger, see build_notes_ledger.py
+BUILD_NOTES_SOURCE = os.environ.get("BUILD_NOTES_SOURCE", "github")
+# number of pr details requests kept in flight while fetching the pr list
+PR_FETCH_WORKERS = int(os.environ.get("PR_FETCH_WORKERS", "8"))
+# "rest" fetches the full pr object per pr, "graphql" fetches only number & body in batches
+PR_FETCH_MODE = os.environ.get("PR_FETCH_MODE", "rest")
+# prs fetched per graphql query
+GRAPHQL_BATCH_SIZE = 100
+GRAPHQL_URL = "https://api.github.com/graphql"
+# pr bodies are parsed in a process pool when there are more prs than this,
+# below it starting the processes costs more than the parsing
+PARSE_PROCESS_THRESHOLD = int(os.environ.get("PARSE_PROCESS_THRESHOLD", "500"))
+# worker processes of the parsing pool
+PARSE_PROCESSES = int(os.environ.get("PARSE_PROCESSES", str(os.cpu_count() or 1)))
+# pr bodies sent to a worker process at a time
+PARSE_CHUNK_SIZE = int(os.environ.get("PARSE_CHUNK_SIZE", "50"))
+# prs folded into the build notes per step of the streaming pipeline, the comma
+# separated jira ids of a step are resolved in one batch
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "100"))
 BUILD_NOTES = "BuildNotes"
 BUILD_DATE = "Date"
 CONFIG_CHANGES = "Config Changes"
@@ -26,6 +58,64 @@ DEPENDENCIES = "Dependencies"
 COMPONENT_RELEASES = "Component Releases"
 JIRA_CHANGES = "Changes"
 MAIN_JIRA_LIST = ["CRP", "CPRE", "CLI", "NPIE", "PIE"]
+# columns of the config tables that make it to the build notes
+CONFIG_CHANGE_KEYS = (
+    "keyPath",
+    "description",
+    "mandatory",
+    "type",
+    "allowed-value",
+    "default-value",
+    "sample-value",
+)
+REMOVED_CONFIG_KEYS = ("keyPath", "description")
+
+
+class Section(NamedTuple):
+    """
+    Maps a pull request template heading to the build notes bucket its rows are grouped into
+
+    kind decides how the rows are grouped:
+    jira -> by jira id, multiple comma separated ids are split into separate entries
+    config -> by the "file" column, keeping the given columns of each row
+    list -> list of the values of the given column
+    """
+
+    heading: str
+    # key of the grouped data in yaml_data
+    bucket: str
+    kind: str
+    # key in BuildNotes (Config Changes for configs) of build_notes.yaml
+    output: str
+    columns: tuple = ()
+
+
+SECTION_SCHEMA = (
+    Section(JIRA_CHANGES, "jira", "jira", JIRA_CHANGES),
+    Section("New Configs", "new", "config", CONFIG_CHANGES_NEW, CONFIG_CHANGE_KEYS),
+    Section(
+        "Changed Configs", "changed", "config", CONFIG_CHANGES_MOD, CONFIG_CHANGE_KEYS
+    ),
+    Section(
+        "Removed Configs", "removed", "config", CONFIG_CHANGES_REM, REMOVED_CONFIG_KEYS
+    ),
+    Section(
+        "Deprecated Configs",
+        "deprecated",
+        "config",
+        CONFIG_CHANGES_DEPR,
+        REMOVED_CONFIG_KEYS,
+    ),
+    Section(LIMITATIONS, "limitations", "list", LIMITATIONS, (LIMITATIONS,)),
+    Section(DEPENDENCIES, "dependencies", "list", DEPENDENCIES, (DEPENDENCIES,)),
+    Section(
+        DEPRECATED_FEATURES,
+        "Deprecated Features",
+        "list",
+        DEPRECATED_FEATURES,
+        (DEPRECATED_FEATURES,),
+    ),
+)
 
 
 def execute_action_based_on_tag(prefix_tags, suffix_tags, contain_tags, tag):
@@ -44,18 +134,12 @@ def execute_action_based_on_tag(prefix_tags, suffix_tags, contain_tags, tag):
     first return type gives the result if the action should be skipped or not if the prefix is '+'. If the prefix is '-' caller should reverse it and use
     second return param indicates if the skip is because of head ref. It will be true only if the pr is revert pr or build notes gen pr
     """
-    for pre in prefix_tags:
-        if tag.startswith(pre):
-            print(f"Matches with prefix -> {pre}")
-            return True
-    for suf in suffix_tags:
-        if tag.endswith(suf):
-            print(f"Matches with suffix -> {suf}")
-            return True
-    for pattern in contain_tags:
-        if pattern in tag:
-            print(f"Matches with pattern -> {pattern}")
-            return True
+    match = compile_patterns(
+        tuple(prefix_tags), tuple(suffix_tags), tuple(contain_tags)
+    ).search(tag)
+    if match is not None:
+        print(f"Matches with pattern -> {match.group()}")
+        return True
     return False
 
 
@@ -67,6 +151,7 @@ def validate_tag(tag_name):
     contain_tags -> format +*(tag_contains_string)*
 
     Exits if tag format doesn't start with "+" or unknown format.
+    The config is read & compiled once per process, see patterns.load_pattern_set.
 
     Params:
     None
@@ -78,45 +163,17 @@ def validate_tag(tag_name):
     contain_tags -> list
     is_it_plus -> bool, will be True if the prefix '+', else False for '-'
     """
-    prefix_tags, suffix_tags, contain_tags = [], [], []
-    is_it_plus = False
-    with open(
-        ".github/scripts/build_notes_configs.json", mode="r", encoding="utf-8"
-    ) as fh:
-        data = json.load(fh)
-    tags = [x.strip() for x in data["tag_pattern"].split()]
-    if not tags:
+    try:
+        pattern_set = load_pattern_set("tag_pattern", kind="tag")
+    except ValueError as err:
+        print(err)
+        sys.exit(1)
+    if pattern_set is None:
         print("No tags provided, updating taglist")
         return True
-    symbol = ""
-    if tags[0].startswith("+"):
-        symbol = "+"
-        is_it_plus = True
-    elif tags[0].startswith("-"):
-        symbol = "-"
-        is_it_plus = False
-    else:
-        print(f"Unknown tag format -> {tags[0]}")
-        sys.exit(1)
-    for tag in tags:
-        if not tag.startswith(symbol):
-            print(
-                f"All the tags should be starting with the same prefix: {symbol}, error -> {tag}"
-            )
-            sys.exit(1)
-        each_tag = tag[1:]  # ignore + in the beginning
-        if each_tag[0] == "*" and each_tag[-1] == "*":  # format -> +*(tag)*
-            contain_tags.append(each_tag[each_tag.find("(") + 1 : each_tag.find(")")])
-        elif each_tag[0] == "*":  # format -> +*(tag)
-            suffix_tags.append(each_tag[each_tag.find("(") + 1 : each_tag.find(")")])
-        elif each_tag[-1] == "*":  # format -> +(tag)*
-            prefix_tags.append(each_tag[each_tag.find("(") + 1 : each_tag.find(")")])
-        else:
-            print(f"Unknown tag format -> {tag}")
-            sys.exit(1)
-    # return prefix_tags, suffix_tags, contain_tags, is_it_plus
+    is_it_plus = pattern_set.is_it_plus
     result = execute_action_based_on_tag(
-        prefix_tags, suffix_tags, contain_tags, tag_name
+        pattern_set.prefixes, pattern_set.suffixes, pattern_set.contains, tag_name
     )
     if not result:
         if is_it_plus:
@@ -151,6 +208,13 @@ def update_taglist(tag_name: str, base_branch: str, head_branch: str) -> bool:
     return validate_tag(tag_name)
 
 
+def project_row(row, keys):
+    """
+    returns dict of the given keys of the parsed table row
+    """
+    return {key: row[key] for key in keys}
+
+
 def cleanup_generated_yaml_data(yaml_data, date, tag, author):
     final_yaml_data = {
         BUILD_NOTES: {
@@ -161,93 +225,49 @@ def cleanup_generated_yaml_data(yaml_data, date, tag, author):
             CONFIG_CHANGES: {},
         }
     }
-    if "jira" in yaml_data:
-        for k, v in yaml_data["jira"].items():
-            final_yaml_data[BUILD_NOTES][JIRA_CHANGES].append(
-                {
-                    "JiraID": k,
-                    "pr": ", ".join(v["PR"]),
-                    "type": v["Type"],
-                    "component": ", ".join(v["Component"]),
-                    "description": ", ".join(v["Description"]),
-                    "stepstoreproduce": ", ".join(v["StepsToReproduce"]),
-                    "impacts": ", ".join(v["Impact"]),
-                }
-            )
-    if "new" in yaml_data:
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_NEW] = []
-        files_list = []
-        for k, v in yaml_data["new"].items():
-            files_list.append(
-                {
-                    "file": k,
-                    "changes": v,
-                }
-            )
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_NEW].append(
-            {"component": author, "files": files_list}
-        )
-    if "changed" in yaml_data:
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_MOD] = []
-        files_list = []
-        for k, v in yaml_data["changed"].items():
-            files_list.append(
-                {
-                    "file": k,
-                    "changes": v,
-                }
-            )
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_MOD].append(
-            {"component": author, "files": files_list}
-        )
-    if "removed" in yaml_data:
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_REM] = []
-        files_list = []
-        for k, v in yaml_data["removed"].items():
-            files_list.append(
-                {
-                    "file": k,
-                    "changes": v,
-                }
-            )
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_REM].append(
-            {"component": author, "files": files_list}
-        )
-    if "deprecated" in yaml_data:
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_DEPR] = []
-        files_list = []
-        for k, v in yaml_data["deprecated"].items():
-            files_list.append(
+    for section in SECTION_SCHEMA:
+        if section.bucket not in yaml_data:
+            continue
+        bucket = yaml_data[section.bucket]
+        if section.kind == "jira":
+            for k, v in bucket.items():
+                final_yaml_data[BUILD_NOTES][JIRA_CHANGES].append(
+                    {
+                        "JiraID": k,
+                        "pr": ", ".join(v["PR"]),
+                        "type": v["Type"],
+                        "component": ", ".join(v["Component"]),
+                        "description": ", ".join(v["Description"]),
+                        "stepstoreproduce": ", ".join(v["StepsToReproduce"]),
+                        "impacts": ", ".join(v["Impact"]),
+                    }
+                )
+        elif section.kind == "config":
+            files_list = [
                 {
                     "file": k,
-                    "changes": v,
+                    "changes": [project_row(row, section.columns) for row in v],
                 }
-            )
-        final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][CONFIG_CHANGES_DEPR].append(
-            {"component": author, "files": files_list}
-        )
-    if "limitations" in yaml_data:
-        final_yaml_data[BUILD_NOTES][LIMITATIONS] = yaml_data["limitations"]
-    if "dependencies" in yaml_data:
-        final_yaml_data[BUILD_NOTES][DEPENDENCIES] = yaml_data["dependencies"]
-    if "Deprecated Features" in yaml_data:
-        final_yaml_data[BUILD_NOTES][DEPRECATED_FEATURES] = yaml_data[
-            "Deprecated Features"
-        ]
+                for k, v in bucket.items()
+            ]
+            final_yaml_data[BUILD_NOTES][CONFIG_CHANGES][section.output] = [
+                {"component": author, "files": files_list}
+            ]
+        else:
+            final_yaml_data[BUILD_NOTES][section.output] = bucket
     return final_yaml_data
 
 
-def get_jira_ids_for_multiple_entries(data):
+def get_required_jira_ids(data):
     """
+    returns the jira ids of a comma separated "Jira ID" cell that make it to the build notes
+
     CRP, GAMMA -> Only CRP
     CRP, CPRE, GAMMA -> CRP & CPRE in 2 rows (ignore GAMMA)
     GAMMA -> Picked as entry
     CRP, CPRE, NPIE -> Split into 3 rows
     GAMMA, GAMMA -> Split into 2 rows and fill description from Jira
     """
-    api_token = os.environ.get("JIRA_PASSWORD", "")
-    jira = Jira(api_token)
-    return_dict = {}
     jira_ids_list = [x.strip() for x in data.split(",")]
     d = defaultdict(list)
     """
@@ -266,251 +286,199 @@ def get_jira_ids_for_multiple_entries(data):
     ignore_comp_tickets = False
     if comp_ticket_count != len(jira_ids_list):
         ignore_comp_tickets = True
+    required_ids = []
     for k, v in d.items():
         if k not in MAIN_JIRA_LIST and ignore_comp_tickets:
             continue
-        for each_id in v:
-            try:
-                data = jira.get(
-                    each_id
-                )  # data should always exist as pr is validated & merged
-                return_dict[each_id] = data["fields"]["summary"]
-            except Exception as err:
-                print(f"Failed getting data for issue -> {each_id} with error {err}")
-                continue
+        required_ids.extend(v)
+    return required_ids
+
+
+def collect_jira_ids(final_dict):
+    """
+    returns the deduped list of jira ids, across all the prs, whose description is filled from jira
+    """
+    jira_ids = {}
+    for pr_data in final_dict.values():
+        if JIRA_CHANGES not in pr_data:
+            continue
+        for e in pr_data[JIRA_CHANGES]["data"]:
+            if "," in e["Jira ID"]:
+                jira_ids.update(dict.fromkeys(get_required_jira_ids(e["Jira ID"])))
+    return list(jira_ids)
+
+
+def resolve_jira_summaries(jira_ids):
+    """
+    returns map of jira id to its summary, resolving all the ids in one batch
+    """
+    if not jira_ids:
+        return {}
+    api_token = os.environ.get("JIRA_PASSWORD", "")
+    jira = Jira(api_token, cache=get_jira_cache())
+    # issues should always exist as pr is validated & merged
+    summaries, missing = jira.get_summaries(jira_ids)
+    for each_id in missing:
+        print(f"Failed getting data for issue -> {each_id}")
+    return summaries
+
+
+def get_jira_ids_for_multiple_entries(data, summaries=None):
+    """
+    returns map of jira id to its summary for a comma separated "Jira ID" cell
+
+    Grouping rules are the same as get_required_jira_ids. summaries is the map
+    returned by resolve_jira_summaries, the ids are fetched from jira if it isn't
+    provided.
+    """
+    required_ids = get_required_jira_ids(data)
+    if summaries is None:
+        summaries = resolve_jira_summaries(required_ids)
+    return_dict = {}
+    for each_id in required_ids:
+        if each_id in summaries:
+            return_dict[each_id] = summaries[each_id]
     return return_dict
 
 
-def generate_build_notes(final_dict):
-    yaml_data = {}
+class BuildNotesAggregator:
+    """
+    Groups the parsed pull request tables into build notes data, driven by SECTION_SCHEMA
+
+    Every row costs a single lookup in its bucket, so grouping stays linear in the
+    number of rows.
+    """
+
+    def __init__(self, summaries=None) -> None:
+        """
+        summaries is the map of jira id to summary used for comma separated jira ids
+        """
+        self.summaries = summaries if summaries is not None else {}
+        self.yaml_data = {}
+
+    def add_pr(self, pr_number, pr_data) -> None:
+        """
+        fold the parsed tables of a pr, as returned by markdown_tables_to_dicts
+        """
+        for section in SECTION_SCHEMA:
+            table = pr_data.get(section.heading)
+            if table is None:
+                continue
+            rows = table.get("data")
+            if section.kind == "config" and not rows:
+                continue
+            # jira and list buckets exist as soon as the pr has the heading
+            bucket = self.get_bucket(section)
+            for row in rows or ():
+                self._add_row(pr_number, section, row, bucket)
+
+    def get_bucket(self, section: Section):
+        bucket = self.yaml_data.get(section.bucket)
+        if bucket is None:
+            bucket = [] if section.kind == "list" else {}
+            self.yaml_data[section.bucket] = bucket
+        return bucket
+
+    def _add_row(self, pr_number, section: Section, row, bucket) -> None:
+        if section.kind == "list":
+            bucket.append(row[section.columns[0]])
+        elif section.kind == "config":
+            changes = bucket.get(row["file"])
+            if changes is None:
+                bucket[row["file"]] = [row]
+            else:
+                changes.append(row)
+        elif "," in row["Jira ID"]:  # handle comma separated jira ids
+            d = get_jira_ids_for_multiple_entries(row["Jira ID"], self.summaries)
+            for issue, desc in d.items():
+                self.add_jira_entry(bucket, issue, pr_number, row, desc)
+        else:
+            self.add_jira_entry(
+                bucket, row["Jira ID"], pr_number, row, row["Change Description"]
+            )
+
+    @staticmethod
+    def add_jira_entry(bucket, issue, pr_number, row, description) -> None:
+        entry = bucket.get(issue)
+        if entry is None:
+            bucket[issue] = {
+                "PR": [str(pr_number)],
+                "Type": row["Type"],
+                "Component": [row["Component name"]],
+                "Description": [description],
+                "StepsToReproduce": [row["Steps to reproduce & validate"]],
+                "Impact": [row["Impact on other features/components"]],
+            }
+        else:
+            entry["PR"].append(str(pr_number))
+            entry["Component"].append(row["Component name"])
+            entry["Description"].append(description)
+            entry["StepsToReproduce"].append(row["Steps to reproduce & validate"])
+            entry["Impact"].append(row["Impact on other features/components"])
+
+
+def generate_build_notes(final_dict, summaries=None):
+    """
+    Group the parsed tables of all the prs into build notes data
+
+    summaries is the map of jira id to summary used for comma separated jira ids,
+    all such ids in final_dict are resolved in one batch if it isn't provided.
+    """
+    if summaries is None:
+        summaries = resolve_jira_summaries(collect_jira_ids(final_dict))
+    aggregator = BuildNotesAggregator(summaries)
     for pr_number, pr_data in final_dict.items():
-        if JIRA_CHANGES in pr_data:
-            if "jira" not in yaml_data:
-                yaml_data["jira"] = {}
-            for e in pr_data[JIRA_CHANGES]["data"]:
-                if "," in e["Jira ID"]:  # handle comma separated jira ids
-                    d = get_jira_ids_for_multiple_entries(e["Jira ID"])
-                    for issue, desc in d.items():
-                        if issue not in yaml_data["jira"]:
-                            yaml_data["jira"][issue] = {
-                                "PR": [str(pr_number)],
-                                "Type": e["Type"],
-                                "Component": [e["Component name"]],
-                                "Description": [desc],
-                                "StepsToReproduce": [
-                                    e["Steps to reproduce & validate"]
-                                ],
-                                "Impact": [e["Impact on other features/components"]],
-                            }
-                        else:
-                            yaml_data["jira"][issue]["PR"].append(str(pr_number))
-                            yaml_data["jira"][issue]["Component"].append(
-                                e["Component name"]
-                            )
-                            yaml_data["jira"][issue]["Description"].append(desc)
-                            yaml_data["jira"][issue]["StepsToReproduce"].append(
-                                e["Steps to reproduce & validate"]
-                            )
-                            yaml_data["jira"][issue]["Impact"].append(
-                                e["Impact on other features/components"]
-                            )
-                else:
-                    if e["Jira ID"] not in yaml_data["jira"]:
-                        yaml_data["jira"][e["Jira ID"]] = {
-                            "PR": [str(pr_number)],
-                            "Type": e["Type"],
-                            "Component": [e["Component name"]],
-                            "Description": [e["Change Description"]],
-                            "StepsToReproduce": [e["Steps to reproduce & validate"]],
-                            "Impact": [e["Impact on other features/components"]],
-                        }
-                    else:
-                        yaml_data["jira"][e["Jira ID"]]["PR"].append(str(pr_number))
-                        yaml_data["jira"][e["Jira ID"]]["Component"].append(
-                            e["Component name"]
-                        )
-                        yaml_data["jira"][e["Jira ID"]]["Description"].append(
-                            e["Change Description"]
-                        )
-                        yaml_data["jira"][e["Jira ID"]]["StepsToReproduce"].append(
-                            e["Steps to reproduce & validate"]
-                        )
-                        yaml_data["jira"][e["Jira ID"]]["Impact"].append(
-                            e["Impact on other features/components"]
-                        )
-        if "New Configs" in pr_data and pr_data["New Configs"]["data"]:
-            if "new" not in yaml_data:
-                yaml_data["new"] = {}
-            for e in pr_data["New Configs"]["data"]:
-                if e["file"] not in yaml_data["new"]:
-                    yaml_data["new"][e["file"]] = [
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                            "mandatory": e["mandatory"],
-                            "type": e["type"],
-                            "allowed-value": e["allowed-value"],
-                            "default-value": e["default-value"],
-                            "sample-value": e["sample-value"],
-                        }
-                    ]
-                else:
-                    yaml_data["new"][e["file"]].append(
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                            "mandatory": e["mandatory"],
-                            "type": e["type"],
-                            "allowed-value": e["allowed-value"],
-                            "default-value": e["default-value"],
-                            "sample-value": e["sample-value"],
-                        }
-                    )
-        if "Changed Configs" in pr_data and pr_data["Changed Configs"]["data"]:
-            if "changed" not in yaml_data:
-                yaml_data["changed"] = {}
-            for e in pr_data["Changed Configs"]["data"]:
-                if e["file"] not in yaml_data["changed"]:
-                    yaml_data["changed"][e["file"]] = [
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                            "mandatory": e["mandatory"],
-                            "type": e["type"],
-                            "allowed-value": e["allowed-value"],
-                            "default-value": e["default-value"],
-                            "sample-value": e["sample-value"],
-                        }
-                    ]
-                else:
-                    yaml_data["changed"][e["file"]].append(
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                            "mandatory": e["mandatory"],
-                            "type": e["type"],
-                            "allowed-value": e["allowed-value"],
-                            "default-value": e["default-value"],
-                            "sample-value": e["sample-value"],
-                        }
-                    )
-        if "Removed Configs" in pr_data and pr_data["Removed Configs"]["data"]:
-            if "removed" not in yaml_data:
-                yaml_data["removed"] = {}
-            for e in pr_data["Removed Configs"]["data"]:
-                if e["file"] not in yaml_data["changed"]:
-                    yaml_data["removed"][e["file"]] = [
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                        }
-                    ]
-                else:
-                    yaml_data["removed"][e["file"]].append(
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                        }
-                    )
-        if "Deprecated Configs" in pr_data and pr_data["Deprecated Configs"]["data"]:
-            if "deprecated" not in yaml_data:
-                yaml_data["deprecated"] = {}
-            for e in pr_data["Deprecated Configs"]["data"]:
-                if e["file"] not in yaml_data["changed"]:
-                    yaml_data["deprecated"][e["file"]] = [
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                        }
-                    ]
-                else:
-                    yaml_data["deprecated"][e["file"]].append(
-                        {
-                            "keyPath": e["keyPath"],
-                            "description": e["description"],
-                        }
-                    )
-        if LIMITATIONS in pr_data:
-            if "limitations" not in yaml_data:
-                yaml_data["limitations"] = []
-            for e in pr_data[LIMITATIONS]["data"]:
-                yaml_data["limitations"].append(e["Limitations"])
-        if DEPENDENCIES in pr_data:
-            if "dependencies" not in yaml_data:
-                yaml_data["dependencies"] = []
-            for e in pr_data[DEPENDENCIES]["data"]:
-                yaml_data["dependencies"].append(e["Dependencies"])
-        if DEPRECATED_FEATURES in pr_data:
-            if "Deprecated Features" not in yaml_data:
-                yaml_data["Deprecated Features"] = []
-            for e in pr_data[DEPRECATED_FEATURES]["data"]:
-                yaml_data["Deprecated Features"].append(e["Deprecated Features"])
-    return yaml_data
+        aggregator.add_pr(pr_number, pr_data)
+    return aggregator.yaml_data
 
 
-def get_pr_body(pr_info_list):
-    final_dict = {}
-    for item in pr_info_list:
-        number = item["number"]
-        data = markdown_tables_to_dicts(item["body"])
-        if not data:
-            continue
-        final_dict[number] = data
-    return final_dict
+def parse_pr_bodies(items, processes=0):
+    """
+    Parse the tables of the (number, body) pairs of items as they come in
+
+    Params:
+    items: iterable of (number, body)
+    processes: int, worker processes to parse in, 0 or 1 parses in this process.
+    Bodies are sent to the workers in chunks of PARSE_CHUNK_SIZE, at most 2 * processes
+    chunks are in flight at a time
+
+    Yields:
+    (number, parsed tables), in the order of items
+    """
+    if processes <= 1:
+        yield from map(parse_pr_body_item, items)
+        return
+    items = iter(items)
+    chunks = iter(lambda: list(itertools.islice(items, PARSE_CHUNK_SIZE)), [])
+    for results in ordered_map(
+        parse_pr_body_chunk, chunks, processes, concurrent.futures.ProcessPoolExecutor
+    ):
+        yield from results
+
+
+def parse_pr_body_chunk(chunk):
+    """
+    returns list of (number, parsed tables) of a list of (number, body) pairs
+
+    Module level, so it can be sent to the worker processes of parse_pr_bodies.
+    """
+    return [parse_pr_body_item(item) for item in chunk]
+
+
+def parse_pr_body_item(item):
+    """
+    returns (number, parsed tables) of a (number, body) pair
+    """
+    number, body = item
+    return number, markdown_tables_to_dicts(body)
 
 
 def markdown_tables_to_dicts(markdown_text):
-    tables = {}
-    current_table = None
-    if not markdown_text or not markdown_text.startswith(
-        "### Changes"
-    ):  # Check if the pull request start with expected md format
-        return tables
-    lines = markdown_text.strip().split("\n")
-    skip_section = False
-    for line in lines:
-        if re.match(r"^#+\s+\w+", line):  # Check for headings
-            current_table = None
-            table_name = line.strip("#").strip()
-            if table_name == "PR changes":
-                skip_section = True
-                continue
-            else:
-                skip_section = False
-            if table_name not in tables:
-                tables[table_name] = {}
-                # skip_rows_count variable shows the rows count that needs to be skipped.
-                # creating new table needs setting up header row, hence the row (separator row) after that will be skipped.
-                tables[table_name]["skip_rows_count"] = 1
-            else:
-                # if the table already exists, then header and separator rows needs to be skipped.
-                tables[table_name]["skip_rows_count"] = 2
-            current_table = tables[table_name]
-        elif re.match(r"^\s*\|.*\|\s*$", line):  # Check for table rows
-            if not skip_section:
-                if current_table is not None:
-                    if "headers" not in current_table:
-                        current_table["headers"] = [
-                            header.strip()
-                            for header in line.strip("|").split("|")
-                            if header.strip()
-                        ]
-                        current_table["data"] = []
-                    else:
-                        # skip_rows_count values as '0' indicates that the current row is data row
-                        if current_table["skip_rows_count"] == 0:
-                            row_data = [
-                                data.strip() for data in line.strip("|").split("|")
-                            ]
-                            if current_table["data"] or any(
-                                cell.strip() for cell in row_data
-                            ):
-                                current_table["data"].append(
-                                    dict(zip(current_table["headers"], row_data))
-                                )
-                        else:
-                            current_table["skip_rows_count"] -= 1
-    return tables
+    # Check if the pull request start with expected md format, "PR changes" is the template's help text.
+    # A pr with a build-notes json block is decoded from the block instead
+    return markdown_parser.markdown_tables_to_dicts(
+        markdown_text, skip_sections=("PR changes",), required_prefix="### Changes"
+    )
 
 
 def get_payload_for_generating_release_notes(tag, base):
@@ -550,19 +518,266 @@ def get_payload_for_generating_release_notes(tag, base):
     return payload_json, True
 
 
-def create_release_files_with_pr_list(pr_list, DATE, CURRENT_TAG, GIT_REPO):
-    pr_info_list = []
-    for each_pr in pr_list:
-        pr_info = requests.get(
-            f"https://api.github.com/repos/{GIT_REPO}/pulls/{each_pr}",
-            headers={
-                "Authorization": f"Bearer {GH_TOKEN}",
-                "Accept": "application/vnd.github.v3+json",
-            },
-        ).json()
-        pr_info_list.append(pr_info)
-    final_dict = get_pr_body(pr_info_list)
-    yaml_data = generate_build_notes(final_dict)
+def get_pr_info(each_pr, GIT_REPO):
+    """
+    returns pr details of the given pr number from github
+    """
+    return response_cache.cached_get(
+        f"https://api.github.com/repos/{GIT_REPO}/pulls/{each_pr}",
+        headers={
+            "Authorization": f"Bearer {GH_TOKEN}",
+            "Accept": "application/vnd.github.v3+json",
+        },
+    ).json()
+
+
+def ordered_map(
+    fn,
+    items,
+    max_workers=PR_FETCH_WORKERS,
+    executor_class=concurrent.futures.ThreadPoolExecutor,
+):
+    """
+    Lazy executor.map, yields fn(item) in the order of items
+
+    Items are submitted as the results are consumed, so at most 2 * max_workers
+    results are in flight or waiting to be consumed, however many items there are.
+    fn must be picklable for a ProcessPoolExecutor.
+    """
+    items = iter(items)
+    if max_workers <= 1:
+        yield from map(fn, items)
+        return
+    with executor_class(max_workers=max_workers) as executor:
+        pending = deque(
+            executor.submit(fn, item)
+            for item in itertools.islice(items, 2 * max_workers)
+        )
+        try:
+            while pending:
+                result = pending.popleft().result()
+                for item in itertools.islice(items, 1):
+                    pending.append(executor.submit(fn, item))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def fetch_pr_item(each_pr, GIT_REPO, parse=False):
+    """
+    returns (number, body) of the pr, (number, parsed tables) if parse is set.
+    The rest of the pr details are dropped
+    """
+    pr_info = get_pr_info(each_pr, GIT_REPO)
+    item = (pr_info["number"], pr_info["body"])
+    return parse_pr_body_item(item) if parse else item
+
+
+def fetch_pr_items_batch(pr_batch, GIT_REPO, parse=False):
+    """
+    returns list of fetch_pr_item results of the prs in pr_batch, fetched with one graphql query
+    """
+    items = [
+        (pr_info["number"], pr_info["body"])
+        for pr_info in get_pr_bodies_batch(pr_batch, GIT_REPO)
+    ]
+    return list(map(parse_pr_body_item, items)) if parse else items
+
+
+def iter_pr_tables(
+    pr_list,
+    GIT_REPO,
+    max_workers=PR_FETCH_WORKERS,
+    fetch_mode=PR_FETCH_MODE,
+    processes=None,
+):
+    """
+    Fetch & parse the prs of pr_list, keeping a bounded number of them in memory
+
+    The bodies are parsed in the fetch threads, or in a pool of processes worker
+    processes if it's more than 1. processes defaults to PARSE_PROCESSES above
+    PARSE_PROCESS_THRESHOLD prs, else 0.
+
+    Yields:
+    (number, parsed tables), in the order of pr_list. Prs without tables are skipped
+    """
+    if processes is None:
+        processes = PARSE_PROCESSES if len(pr_list) > PARSE_PROCESS_THRESHOLD else 0
+    parse = processes <= 1
+    if fetch_mode == "graphql":
+        batches = (
+            pr_list[i : i + GRAPHQL_BATCH_SIZE]
+            for i in range(0, len(pr_list), GRAPHQL_BATCH_SIZE)
+        )
+        results = itertools.chain.from_iterable(
+            ordered_map(
+                lambda pr_batch: fetch_pr_items_batch(pr_batch, GIT_REPO, parse),
+                batches,
+                max_workers,
+            )
+        )
+    else:
+        results = ordered_map(
+            lambda each_pr: fetch_pr_item(each_pr, GIT_REPO, parse),
+            pr_list,
+            max_workers,
+        )
+    if not parse:
+        results = parse_pr_bodies(results, processes)
+    for number, data in results:
+        if data:
+            yield number, data
+
+
+def build_notes_from_pr_tables(
+    pr_tables, chunk_size=STREAM_CHUNK_SIZE, aggregator=None
+):
+    """
+    Group the (number, parsed tables) pairs into build notes data as they come in
+
+    Same result as generate_build_notes, but only chunk_size prs are held at a time.
+    The comma separated jira ids of each chunk are resolved in one batch.
+    aggregator, if given, is the BuildNotesAggregator the prs are folded into.
+    """
+    if aggregator is None:
+        aggregator = BuildNotesAggregator()
+    pr_tables = iter(pr_tables)
+    while True:
+        chunk = dict(itertools.islice(pr_tables, chunk_size))
+        if not chunk:
+            break
+        jira_ids = [
+            each_id
+            for each_id in collect_jira_ids(chunk)
+            if each_id not in aggregator.summaries
+        ]
+        aggregator.summaries.update(resolve_jira_summaries(jira_ids))
+        for pr_number, pr_data in chunk.items():
+            aggregator.add_pr(pr_number, pr_data)
+    return aggregator.yaml_data
+
+
+def generate_build_notes_incremental(
+    pr_list,
+    GIT_REPO,
+    CURRENT_TAG,
+    state_path=BUILD_NOTES_STATE,
+    max_workers=PR_FETCH_WORKERS,
+    fetch_mode=PR_FETCH_MODE,
+):
+    """
+    Build notes data of the prs in pr_list, reusing the state of the last run for the tag
+
+    If the prs of the last run are an unchanged start of pr_list, only the prs after
+    them are fetched and folded into the saved build notes data, otherwise all the prs
+    are fetched & grouped again. Either way the prs are streamed like
+    create_release_files_with_pr_list does. The state is updated at state_path.
+    """
+    pr_list = [str(each_pr) for each_pr in pr_list]
+    state = BuildNotesState.load(state_path, GIT_REPO, CURRENT_TAG)
+    edited_at = fetch_pr_edited_at(pr_list, GIT_REPO, max_workers)
+    aggregator = BuildNotesAggregator(state.summaries)
+    if state.can_extend(pr_list, edited_at):
+        aggregator.yaml_data = state.aggregate
+        new_prs = pr_list[len(state.order) :]
+    else:
+        new_prs = pr_list
+    print(f"{len(new_prs)} of {len(pr_list)} prs are new or edited since the last run")
+    pr_tables = iter_pr_tables(new_prs, GIT_REPO, max_workers, fetch_mode)
+    yaml_data = build_notes_from_pr_tables(pr_tables, aggregator=aggregator)
+    state.order = pr_list
+    state.edited_at = {each_pr: edited_at.get(each_pr) for each_pr in pr_list}
+    state.summaries = aggregator.summaries
+    state.aggregate = yaml_data
+    state.save(state_path)
+    return yaml_data
+
+
+def query_pr_batch(pr_batch, GIT_REPO, fields):
+    """
+    returns map of pr number to the given fields of the prs in pr_batch, using a single graphql query
+
+    Each pr is fetched with an aliased pullRequest(number:) field, prs that couldn't be
+    fetched are left out.
+    """
+    owner, name = GIT_REPO.split("/")
+    pr_fields = "\n".join(
+        f"pr{int(each_pr)}: pullRequest(number: {int(each_pr)}) {{ {fields} }}"
+        for each_pr in pr_batch
+    )
+    query = (
+        "query($owner: String!, $name: String!) {"
+        f" repository(owner: $owner, name: $name) {{ {pr_fields} }} }}"
+    )
+    res = http_client.post(
+        GRAPHQL_URL,
+        headers={"Authorization": f"Bearer {GH_TOKEN}"},
+        json={"query": query, "variables": {"owner": owner, "name": name}},
+    ).json()
+    for err in res.get("errors", []):
+        if err.get("type") == "RATE_LIMITED":
+            raise http_client.RateLimitError(f"Rate limited by github graphql: {err}")
+        print(f"Graphql error while fetching prs -> {err.get('message', err)}")
+    repo_data = (res.get("data") or {}).get("repository") or {}
+    results = {}
+    for each_pr in pr_batch:
+        pr_info = repo_data.get(f"pr{int(each_pr)}")
+        if not pr_info:
+            print(f"Failed getting details of pr -> {each_pr}")
+            continue
+        results[each_pr] = pr_info
+    return results
+
+
+def get_pr_bodies_batch(pr_batch, GIT_REPO):
+    """
+    returns number & body of the prs in pr_batch using a single graphql query, prs that
+    couldn't be fetched are skipped
+    """
+    return [
+        {"number": pr_info["number"], "body": pr_info["body"]}
+        for pr_info in query_pr_batch(pr_batch, GIT_REPO, "number body").values()
+    ]
+
+
+def fetch_pr_edited_at(pr_list, GIT_REPO, max_workers=PR_FETCH_WORKERS):
+    """
+    returns map of pr number to its lastEditedAt, "" for a pr that was never edited.
+    One graphql query per GRAPHQL_BATCH_SIZE prs, prs that couldn't be fetched are left out
+    """
+    batches = [
+        pr_list[i : i + GRAPHQL_BATCH_SIZE]
+        for i in range(0, len(pr_list), GRAPHQL_BATCH_SIZE)
+    ]
+    edited_at = {}
+    for results in ordered_map(
+        lambda pr_batch: query_pr_batch(pr_batch, GIT_REPO, "number lastEditedAt"),
+        batches,
+        max_workers,
+    ):
+        for each_pr, pr_info in results.items():
+            edited_at[str(each_pr)] = pr_info["lastEditedAt"] or ""
+    return edited_at
+
+
+def create_release_files_with_pr_list(
+    pr_list,
+    DATE,
+    CURRENT_TAG,
+    GIT_REPO,
+    max_workers=PR_FETCH_WORKERS,
+    fetch_mode=PR_FETCH_MODE,
+    state_path=BUILD_NOTES_STATE,
+):
+    if state_path:
+        yaml_data = generate_build_notes_incremental(
+            pr_list, GIT_REPO, CURRENT_TAG, state_path, max_workers, fetch_mode
+        )
+    else:
+        # each pr is fetched, parsed & grouped, then dropped
+        pr_tables = iter_pr_tables(pr_list, GIT_REPO, max_workers, fetch_mode)
+        yaml_data = build_notes_from_pr_tables(pr_tables)
     final_yaml_data = cleanup_generated_yaml_data(
         yaml_data, DATE, CURRENT_TAG, GIT_REPO.split("/")[-1]
     )
@@ -571,21 +786,56 @@ def create_release_files_with_pr_list(pr_list, DATE, CURRENT_TAG, GIT_REPO):
         yaml.dump(final_yaml_data, outfile)
 
 
-def main():
-    GIT_REPO = sys.argv[1]
-    BASE_BRANCH = sys.argv[2]
-    # LAST_TAG = sys.argv[3]
-    CURRENT_TAG = sys.argv[3]
-    DATE = sys.argv[4]
-    if not GH_TOKEN:
-        print("Not able to get GH_TOKEN")
-        exit(1)
-    # in body "target_commitish" is optional if the "tag_name" already exists
-    # if "tag_name" doesn't exist then "target_commitish" is used
-    payload, status = get_payload_for_generating_release_notes(CURRENT_TAG, BASE_BRANCH)
-    if not status:
-        sys.exit(1)
-    pr_list_res = requests.post(
+def warn_missing_ledger_prs(pr_list, ledger_path=BUILD_NOTES_LEDGER):
+    """
+    Warn about the prs of the release that aren't in the ledger, their append failed or
+    they merged before the ledger was enabled
+
+    Returns:
+    list of the missing pr numbers
+    """
+    recorded = recorded_prs(read_ledger(ledger_path))
+    missing = [each_pr for each_pr in pr_list if int(each_pr) not in recorded]
+    if missing:
+        print(
+            f"::warning::{len(missing)} prs of the release aren't in {ledger_path}, "
+            f"their build notes are missing -> {missing}"
+        )
+    return missing
+
+
+def create_release_files_from_ledger(
+    DATE, CURRENT_TAG, GIT_REPO, ledger_path=BUILD_NOTES_LEDGER, pr_list=None
+):
+    """
+    Write build_notes.yaml from the pending prs of the merge time ledger, without fetching
+    any pr
+
+    pr_list is the pr list of the release, checked against the ledger if given
+    """
+    if pr_list is not None:
+        warn_missing_ledger_prs(pr_list, ledger_path)
+    final_dict, summaries = load_pending(ledger_path)
+    print(f"pr list -> {list(final_dict)}")
+    # jira ids whose summary couldn't be resolved when the pr merged
+    missing = [
+        each_id for each_id in collect_jira_ids(final_dict) if each_id not in summaries
+    ]
+    summaries.update(resolve_jira_summaries(missing))
+    yaml_data = generate_build_notes(final_dict, summaries)
+    final_yaml_data = cleanup_generated_yaml_data(
+        yaml_data, DATE, CURRENT_TAG, GIT_REPO.split("/")[-1]
+    )
+    yaml = YAML()
+    with open("build_notes.yaml", mode="w", encoding="utf-8") as outfile:
+        yaml.dump(final_yaml_data, outfile)
+
+
+def get_release_pr_list(GIT_REPO, payload):
+    """
+    returns the pr numbers of the release, from the generate-notes api
+    """
+    pr_list_res = http_client.post(
         f"https://api.github.com/repos/{GIT_REPO}/releases/generate-notes",
         headers={
             "Authorization": f"Bearer {GH_TOKEN}",
@@ -601,7 +851,28 @@ def main():
             res = line.rsplit("/", 1)
             pr_list.append(res[1])
     print(f"pr list -> {pr_list}")
-    create_release_files_with_pr_list(pr_list, DATE, CURRENT_TAG, GIT_REPO)
+    return pr_list
+
+
+def main():
+    GIT_REPO = sys.argv[1]
+    BASE_BRANCH = sys.argv[2]
+    # LAST_TAG = sys.argv[3]
+    CURRENT_TAG = sys.argv[3]
+    DATE = sys.argv[4]
+    if not GH_TOKEN:
+        print("Not able to get GH_TOKEN")
+        exit(1)
+    # in body "target_commitish" is optional if the "tag_name" already exists
+    # if "tag_name" doesn't exist then "target_commitish" is used
+    payload, status = get_payload_for_generating_release_notes(CURRENT_TAG, BASE_BRANCH)
+    if not status:
+        sys.exit(1)
+    pr_list = get_release_pr_list(GIT_REPO, payload)
+    if BUILD_NOTES_SOURCE == "ledger":
+        create_release_files_from_ledger(DATE, CURRENT_TAG, GIT_REPO, pr_list=pr_list)
+    else:
+        create_release_files_with_pr_list(pr_list, DATE, CURRENT_TAG, GIT_REPO)
     # merge sub component build notes
     if not os.path.isfile("releases.yaml") or not os.path.isfile(
         ".github/scripts/key2repo.json"
@@ -611,12 +882,12 @@ def main():
         )
         return
     yaml = YAML()
-    obj = MergeBuildNotes(CURRENT_TAG)
+    obj = MergeBuildNotes(CURRENT_TAG, GIT_REPO)
     if not obj.rls_data:
         # if releses.yaml data is empty
         return
-    sub_components = obj.get_sub_components()
-    final_data = obj.merge_sub_components(sub_components)
+    # sub components are downloaded in parallel & merged in the order of releases.yaml
+    final_data = obj.merge_sub_components()
     final_dumpable_data = final_data.custom_to_actual()
     with open("build_notes.yaml", mode="w", encoding="utf-8") as fh:
         yaml.dump(final_dumpable_data, fh)
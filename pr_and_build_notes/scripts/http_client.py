@@ -0,0 +1,259 @@
+"""
+Shared http client for the github and jira api calls
+
+Keeps one keep-alive session per host, so a run making hundreds of calls to
+api.github.com or the jira instance pays for the tcp + tls handshake once per host.
+
+Every request goes through the rate limiter of its host. It spaces requests with a
+token bucket, slows down as X-RateLimit-Remaining gets low, and retries throttled
+(429, rate limited 403) and failed (5xx, connection error) requests with backoff and
+jitter, honouring Retry-After and X-RateLimit-Reset.
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# seconds, used when the caller doesn't pass a timeout
+DEFAULT_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "30"))
+# max connections kept open per host, should be >= the worker count of any thread pool
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+COMMON_HEADERS = {
+    "User-Agent": "build-notes-workflow",
+}
+# sustained requests per second per host, bursts of up to HTTP_BURST requests are allowed
+REQUESTS_PER_SECOND = float(os.environ.get("HTTP_REQUESTS_PER_SECOND", "10"))
+BURST = int(os.environ.get("HTTP_BURST", "10"))
+# retries of throttled or failed requests
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "5"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# once less than this fraction of the rate limit remains, requests are spread evenly
+# over the time left till the limit resets
+LOW_REMAINING_FRACTION = 0.1
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class RateLimitError(requests.HTTPError):
+    """
+    Raised when a request is still throttled after all the retries
+    """
+
+
+class RateLimiter:
+    """
+    Per host request scheduler
+    """
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int = BURST) -> None:
+        """
+        init function
+        """
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        # min seconds between requests, set when the rate limit is running low
+        self.min_interval = 0.0
+        self.last_slot = 0.0
+        # no requests are sent before this time, set when throttled
+        self.paused_until = 0.0
+
+    def acquire(self) -> None:
+        """
+        block until the next request can be sent
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            start = now
+            if self.tokens < 1:
+                start = now + (1 - self.tokens) / self.rate
+            # the token is taken right away, later callers queue up behind this slot
+            self.tokens -= 1
+            start = max(start, self.paused_until, self.last_slot + self.min_interval)
+            self.last_slot = start
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        hold all the requests of the host for the given seconds
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update(self, response: requests.Response) -> None:
+        """
+        adapt the request spacing to the rate limit headers of the response
+        """
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        limit = response.headers.get("X-RateLimit-Limit")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+            limit = int(limit) if limit is not None else 0
+        except ValueError:
+            return
+        seconds_to_reset = max(0.0, reset - time.time())
+        with self.lock:
+            if remaining <= 0:
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + seconds_to_reset
+                )
+            elif limit and remaining < limit * LOW_REMAINING_FRACTION:
+                self.min_interval = seconds_to_reset / remaining
+            else:
+                self.min_interval = 0.0
+
+
+def get_rate_limiter(host: str) -> RateLimiter:
+    """
+    returns the shared rate limiter for host, creating it on first use
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = RateLimiter()
+            _limiters[host] = limiter
+    return limiter
+
+
+def is_rate_limited(response: requests.Response) -> bool:
+    """
+    returns if the response was rejected because of primary or secondary rate limits
+    """
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    return (
+        response.headers.get("X-RateLimit-Remaining") == "0"
+        or "Retry-After" in response.headers
+        or "rate limit" in response.text.lower()
+    )
+
+
+def get_retry_delay(response, attempt: int) -> float:
+    """
+    returns seconds to wait before retrying, based on the response headers if possible
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        reset = response.headers.get("X-RateLimit-Reset")
+        if response.headers.get("X-RateLimit-Remaining") == "0" and reset:
+            try:
+                return max(0.0, float(reset) - time.time()) + 1
+            except ValueError:
+                pass
+    # exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def get_session(host: str) -> requests.Session:
+    """
+    returns the shared session for host, creating it on first use
+    """
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(COMMON_HEADERS)
+            _sessions[host] = session
+    return session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    send the request through the pooled session & rate limiter of the url's host
+
+    Accepts the same keyword arguments as requests.request. Headers passed by the
+    caller are merged over the common headers.
+
+    Raises RateLimitError if the request is still throttled after MAX_RETRIES retries.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    host = urlsplit(url).netloc
+    session = get_session(host)
+    limiter = get_rate_limiter(host)
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= MAX_RETRIES:
+                raise
+            time.sleep(get_retry_delay(None, attempt))
+            attempt += 1
+            continue
+        limiter.update(response)
+        rate_limited = is_rate_limited(response)
+        if not rate_limited and response.status_code not in RETRY_STATUS_CODES:
+            return response
+        if attempt >= MAX_RETRIES:
+            if rate_limited:
+                raise RateLimitError(
+                    f"Rate limited by {host} after {attempt} retries: {response.status_code}",
+                    response=response,
+                )
+            return response
+        delay = get_retry_delay(response, attempt)
+        print(
+            f"{method} {url} failed with {response.status_code}, retrying in {delay:.1f}s"
+        )
+        if rate_limited:
+            limiter.pause(delay)
+        else:
+            time.sleep(delay)
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> requests.Response:
+    return request("PATCH", url, **kwargs)
+
+
+def close_all() -> None:
+    """
+    close all the sessions opened so far
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
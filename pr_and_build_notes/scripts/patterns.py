@@ -0,0 +1,158 @@
+"""
+Branch and tag patterns of build_notes_configs.json
+
+A pattern list is a space separated list of tokens, all starting with the same
+symbol: '+' to run the action for matching names, '-' to skip it for them.
++(x)* -> starts with x
++*(x) -> ends with x
++*(x)* -> contains x
+
+The tokens are compiled once into a single regex and the compiled sets are memoized
+per config file, so matching many refs costs one regex search per ref.
+"""
+
+import functools
+import json
+import re
+import sys
+
+CONFIG_PATH = ".github/scripts/build_notes_configs.json"
+
+
+class PatternSet:
+    """
+    Compiled prefix, suffix & contains patterns
+    """
+
+    def __init__(self, prefixes=(), suffixes=(), contains=(), is_it_plus=True) -> None:
+        """
+        init function
+        """
+        self.prefixes = list(prefixes)
+        self.suffixes = list(suffixes)
+        self.contains = list(contains)
+        self.is_it_plus = is_it_plus
+        alternatives = []
+        if self.prefixes:
+            alternatives.append(
+                r"\A(?:" + "|".join(map(re.escape, self.prefixes)) + ")"
+            )
+        if self.suffixes:
+            alternatives.append(
+                "(?:" + "|".join(map(re.escape, self.suffixes)) + r")\Z"
+            )
+        if self.contains:
+            alternatives.append("(?:" + "|".join(map(re.escape, self.contains)) + ")")
+        self.regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def from_spec(cls, spec: str, kind: str = "pattern") -> "PatternSet":
+        """
+        Parse a space separated pattern list, e.g. "+*(rc) +*(feat)* +(bug)*"
+
+        Returns None if spec has no patterns.
+        Raises ValueError for an unknown format or tokens not starting with the same symbol.
+        """
+        tokens = [x.strip() for x in spec.split()]
+        if not tokens:
+            return None
+        if tokens[0].startswith("+"):
+            symbol, is_it_plus = "+", True
+        elif tokens[0].startswith("-"):
+            symbol, is_it_plus = "-", False
+        else:
+            raise ValueError(f"Unknown {kind} format -> {tokens[0]}")
+        prefixes, suffixes, contains = [], [], []
+        for token in tokens:
+            if not token.startswith(symbol):
+                raise ValueError(
+                    f"All the {kind}s should be starting with the same prefix: {symbol}, error -> {token}"
+                )
+            each = token[1:]  # ignore + in the beginning
+            value = each[each.find("(") + 1 : each.find(")")]
+            if not each:
+                raise ValueError(f"Unknown {kind} format -> {token}")
+            if each[0] == "*" and each[-1] == "*":  # format -> +*(x)*
+                contains.append(value)
+            elif each[0] == "*":  # format -> +*(x)
+                suffixes.append(value)
+            elif each[-1] == "*":  # format -> +(x)*
+                prefixes.append(value)
+            else:
+                raise ValueError(f"Unknown {kind} format -> {token}")
+        return cls(prefixes, suffixes, contains, is_it_plus)
+
+    def search(self, name: str):
+        """
+        returns the re.Match of the first pattern matching name, None if nothing matches
+        """
+        if self.regex is None:
+            return None
+        return self.regex.search(name)
+
+    def match(self, name: str) -> bool:
+        return self.search(name) is not None
+
+    def match_many(self, names) -> list:
+        """
+        returns list of bool, if each of the names matches any of the patterns
+        """
+        if self.regex is None:
+            return [False for _ in names]
+        search = self.regex.search
+        return [search(name) is not None for name in names]
+
+    def should_run(self, name: str) -> bool:
+        """
+        returns if the action should run for name, taking the '+' / '-' symbol into account
+        """
+        return self.match(name) == self.is_it_plus
+
+
+@functools.lru_cache(maxsize=None)
+def compile_patterns(prefixes=(), suffixes=(), contains=()) -> PatternSet:
+    """
+    returns the memoized PatternSet of the given pattern tuples
+    """
+    return PatternSet(prefixes, suffixes, contains)
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path: str = CONFIG_PATH) -> dict:
+    """
+    returns the memoized contents of the build notes config file
+    """
+    with open(path, mode="r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+@functools.lru_cache(maxsize=None)
+def load_pattern_set(key: str, path: str = CONFIG_PATH, kind: str = "pattern"):
+    """
+    returns the memoized PatternSet of the config key, e.g. "branch_pattern" / "tag_pattern"
+
+    Returns None if the key has no patterns, raises ValueError for invalid patterns.
+    """
+    return PatternSet.from_spec(load_config(path)[key], kind)
+
+
+def main():
+    """
+    print the refs read from stdin, one per line, for which the action should run
+
+    Usage: python patterns.py branch_pattern|tag_pattern [config_path] < refs.txt
+    """
+    key = sys.argv[1]
+    path = sys.argv[2] if len(sys.argv) > 2 else CONFIG_PATH
+    pattern_set = load_pattern_set(key, path)
+    refs = [line.strip() for line in sys.stdin if line.strip()]
+    if pattern_set is None:
+        print("\n".join(refs))
+        return
+    for ref, matched in zip(refs, pattern_set.match_many(refs)):
+        if matched == pattern_set.is_it_plus:
+            print(ref)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Persistent cache of parsed sub component build notes
+
+Keyed by (owner/repo, tag, path). A tag always points to the same build_notes.yaml,
+so entries are never revalidated and a hit costs no github call, no base64 decode
+and no yaml parse. Values are stored pickled, one file per key. A file that doesn't
+exist at the tag is cached as MISSING_FILE, so it isn't requested again. github answers
+404 for a repo the token can't read too, so a miss is only stored once the tag is
+confirmed readable, otherwise it is kept in memory for this run only. The least
+recently used entries are evicted beyond SUB_COMPONENT_CACHE_MAX_BYTES.
+
+The cache lives in BUILD_NOTES_CACHE_DIR and can be persisted between workflow
+runs with actions/cache.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+
+from response_cache import BUILD_NOTES_CACHE_DIR, evict_least_recently_used
+
+# bump when the pickled format changes, older entries are ignored
+CACHE_VERSION = 1
+# least recently used entries are evicted once the cache grows beyond this size
+SUB_COMPONENT_CACHE_MAX_BYTES = int(
+    os.environ.get("SUB_COMPONENT_CACHE_MAX_BYTES", str(100 * 1024**2))
+)
+
+
+class MissingFile:
+    """
+    Cached in place of the value of a file that doesn't exist at the tag
+    """
+
+    __slots__ = ()
+
+
+MISSING_FILE = MissingFile()
+
+
+class SubComponentCache:
+    """
+    (repo, tag, path) -> parsed value map, one pickle file per key
+    """
+
+    def __init__(
+        self, path: str, max_bytes: int = SUB_COMPONENT_CACHE_MAX_BYTES
+    ) -> None:
+        """
+        init function
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # (repo, tag, path) of the unconfirmed misses of this run
+        self.missed = set()
+        os.makedirs(self.path, exist_ok=True)
+        self.size = sum(
+            os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path)
+        )
+
+    def _entry_path(self, repo: str, tag: str, file_path: str) -> str:
+        key = f"{CACHE_VERSION}\n{repo}\n{tag}\n{file_path}"
+        return os.path.join(
+            self.path, f"{hashlib.sha256(key.encode()).hexdigest()}.pickle"
+        )
+
+    def get(self, repo: str, tag: str, file_path: str):
+        """
+        returns the cached value, None if it isn't cached
+        """
+        if (repo, tag, file_path) in self.missed:
+            return MISSING_FILE
+        entry_path = self._entry_path(repo, tag, file_path)
+        try:
+            with open(entry_path, mode="rb") as fh:
+                value = pickle.load(fh)
+            os.utime(entry_path)  # mark as recently used
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            print(
+                f"Ignoring unreadable cache entry of {repo}@{tag}:{file_path} -> {err}"
+            )
+            return None
+
+    def set(self, repo: str, tag: str, file_path: str, value) -> None:
+        entry_path = self._entry_path(repo, tag, file_path)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            if os.path.exists(entry_path):
+                self.size -= os.path.getsize(entry_path)
+            tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode="wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, entry_path)
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self.size = evict_least_recently_used(
+                    self.path, self.size, self.max_bytes
+                )
+
+    def set_missing(self, repo: str, tag: str, file_path: str, persist: bool) -> None:
+        """
+        Record that the file doesn't exist at tag, on disk if persist else in memory only
+        """
+        if persist:
+            self.set(repo, tag, file_path, MISSING_FILE)
+        else:
+            with self.lock:
+                self.missed.add((repo, tag, file_path))
+
+
+_sub_component_cache = None
+_sub_component_cache_lock = threading.Lock()
+
+
+def get_sub_component_cache():
+    """
+    returns the shared sub component cache, None if caching is disabled
+    """
+    global _sub_component_cache
+    if not BUILD_NOTES_CACHE_DIR:
+        return None
+    with _sub_component_cache_lock:
+        if _sub_component_cache is None:
+            _sub_component_cache = SubComponentCache(
+                os.path.join(BUILD_NOTES_CACHE_DIR, "sub_components")
+            )
+    return _sub_component_cache
@@ -4,7 +4,7 @@ import json
 import os
 import sys
 
-import requests
+import http_client
 from github import Github
 from ruamel.yaml import YAML
 
@@ -18,7 +18,7 @@ def get_release_url(repo_full_name, tag_name, access_token):
     }
     res_url = ""
     try:
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         if response.status_code == 200:
             res_url = response.json()["url"]
         else:
@@ -36,7 +36,7 @@ def update_release(repo_full_name, release_id, new_body, access_token):
         "X-GitHub-Api-Version": "2022-11-28",
     }
     data = {"body": new_body}
-    response = requests.patch(url, headers=headers, data=json.dumps(data))
+    response = http_client.patch(url, headers=headers, data=json.dumps(data))
     if response.status_code == 200:
         print("Release updated successfully!")
     else:
@@ -2,6 +2,7 @@
 Updates jira id with the tag details
 """
 
+import concurrent.futures
 import os
 import sys
 
@@ -12,6 +13,35 @@ JIRA_PASSWORD = os.environ.get("JIRA_PASSWORD", None)
 if not JIRA_PASSWORD:
     print(f"Jira password is empty, exiting...")
     sys.exit(1)
+# number of jira issues updated in parallel
+JIRA_UPDATE_WORKERS = int(os.environ.get("JIRA_UPDATE_WORKERS", "8"))
+
+
+def update_issue(jira, issue_key, response_data, entries):
+    """
+    Update the custom field of issue_key with all of its build notes entries
+
+    Returns:
+    str, one of "updated" or "unchanged"
+    raises an exception if the update fails
+    """
+    try:
+        current_payload = response_data["fields"]["customfield_12562"] or ""
+        # print(f"current_payload -> {current_payload}")
+    except Exception as err:  # doesn't have the required custom field
+        current_payload = ""
+    payload_as_str = current_payload
+    for entry in entries:
+        payload_dict = jira.payload_str_to_dict(payload_as_str, entry)
+        payload_as_str = jira.reconstruct_jira_payload_from_dict_to_str(payload_dict)
+    # skip the update if the issue already has all the entries, e.g. on a rerun
+    if current_payload and jira.jira_custom_field_to_dict(
+        current_payload
+    ) == jira.jira_custom_field_to_dict(payload_as_str):
+        return "unchanged"
+    if not jira.put(issue_key, payload=payload_as_str):
+        raise RuntimeError("update request failed")
+    return "updated"
 
 
 def main():
@@ -20,21 +50,39 @@ def main():
     jira = Jira(JIRA_PASSWORD)
     with open("build_notes.yaml", mode="r", encoding="utf-8") as fh:
         data = yaml.load(fh)
+    entries_by_issue = {}
     for entry in data["BuildNotes"]["Changes"]:
-        response_data = jira.get(entry["JiraID"])
-        if not response_data:
-            print(
-                f"Jira issue: {entry['JiraID']} does not exist or user doesn't have permissions to access the issue"
-            )
-            sys.exit(1)
-        try:
-            current_payload = response_data["fields"]["customfield_12562"]
-            # print(f"current_payload -> {current_payload}")
-        except Exception as err:  # doesn't have the required custom field
-            current_payload = ""
-        payload_dict = jira.payload_str_to_dict(current_payload, entry)
-        payload_as_str = jira.reconstruct_jira_payload_from_dict_to_str(payload_dict)
-        jira.put(entry["JiraID"], payload=payload_as_str)
+        entries_by_issue.setdefault(entry["JiraID"], []).append(entry)
+    issues, missing = jira.get_many(entries_by_issue, fields=["customfield_12562"])
+    errors = {
+        issue_key: "does not exist or user doesn't have permissions to access the issue"
+        for issue_key in missing
+    }
+    results = {"updated": [], "unchanged": []}
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=JIRA_UPDATE_WORKERS
+    ) as executor:
+        future_to_issue = {
+            executor.submit(
+                update_issue, jira, issue_key, issues[issue_key], entries
+            ): issue_key
+            for issue_key, entries in entries_by_issue.items()
+            if issue_key in issues
+        }
+        for future in concurrent.futures.as_completed(future_to_issue):
+            issue_key = future_to_issue[future]
+            try:
+                results[future.result()].append(issue_key)
+            except Exception as err:
+                errors[issue_key] = str(err)
+    print(
+        f"Jira update summary: {len(results['updated'])} updated, "
+        f"{len(results['unchanged'])} unchanged, {len(errors)} failed"
+    )
+    for issue_key, err in errors.items():
+        print(f"Jira issue: {issue_key} -> {err}")
+    if errors:
+        sys.exit(1)
 
 
 if __name__ == "__main__":